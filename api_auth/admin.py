@@ -1,11 +1,25 @@
 from django.contrib import admin
 from rest_framework.authtoken.models import Token
+from .authentication import token_cache
 
 @admin.register(Token)
 class CustomTokenAdmin(admin.ModelAdmin):
-    list_display = ('user', 'created')
+    list_display = ('user', 'created', 'last_used')
+    list_select_related = ('user', 'usage')
     fields = ('user',)
     
+    def last_used(self, obj):
+        usage = getattr(obj, 'usage', None)
+        return usage.last_used if usage else None
+    
+    def delete_model(self, request, obj):
+        token_cache.evict(obj.key)
+        super().delete_model(request, obj)
+    
+    def delete_queryset(self, request, queryset):
+        token_cache.evict(*queryset.values_list('key', flat=True))
+        super().delete_queryset(request, queryset)
+    
     def save_model(self, request, obj, form, change):
         if not change:  # Only when creating a new token
             # Save the object first to generate a key
@@ -0,0 +1,123 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from .models import TokenUsage
+
+logger = logging.getLogger(__name__)
+
+
+class TokenCache:
+    """Thread-safe LRU cache of token key -> (user, token) with a TTL"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def evict(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class UsageRecorder:
+    """
+    Collects token last-used times in memory and writes them to TokenUsage
+    at most once per ``interval`` seconds, instead of once per request.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._pending = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def touch(self, key):
+        with self._lock:
+            self._pending[key] = timezone.now()
+            due = time.monotonic() - self._last_flush >= self.interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+
+        try:
+            # Tokens may have been deleted since they were used
+            live = set(Token.objects.filter(key__in=pending).values_list('key', flat=True))
+            existing = set(TokenUsage.objects.filter(token_id__in=live).values_list('token_id', flat=True))
+            TokenUsage.objects.bulk_update(
+                [TokenUsage(token_id=key, last_used=pending[key]) for key in existing],
+                ['last_used']
+            )
+            TokenUsage.objects.bulk_create(
+                [TokenUsage(token_id=key, last_used=pending[key]) for key in live - existing],
+                ignore_conflicts=True
+            )
+        except Exception:
+            # Usage tracking must never fail the request that triggered it
+            logger.exception('Could not record API token usage')
+
+
+token_cache = TokenCache(
+    maxsize=getattr(settings, 'TOKEN_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'TOKEN_CACHE_TTL', 60)
+)
+usage_recorder = UsageRecorder(interval=getattr(settings, 'TOKEN_USAGE_FLUSH_INTERVAL', 60))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that keeps resolved tokens in a per-process LRU
+    cache, so repeat callers skip the token/user query. Deleting a token
+    or saving its user (e.g. to deactivate them) evicts it from this
+    process immediately; other processes drop it when its TTL
+    (TOKEN_CACHE_TTL seconds) runs out.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, (user, token))
+        else:
+            user, token = cached
+            if not user.is_active:
+                raise exceptions.AuthenticationFailed('User inactive or deleted.')
+
+        usage_recorder.touch(key)
+        return user, token
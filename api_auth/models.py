@@ -1,3 +1,10 @@
 from django.db import models
+from rest_framework.authtoken.models import Token
 
-# Create your models here.
+class TokenUsage(models.Model):
+    """When an API token was last used, written in batches by CachedTokenAuthentication"""
+    token = models.OneToOneField(Token, on_delete=models.CASCADE, primary_key=True, related_name='usage')
+    last_used = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.token_id} last used {self.last_used}"
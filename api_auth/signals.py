@@ -0,0 +1,21 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .authentication import token_cache
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    # Covers tokens removed outside the admin, e.g. when their user is deleted
+    token_cache.evict(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def evict_saved_users_tokens(sender, instance, created, update_fields=None, **kwargs):
+    # Cached tokens hold a copy of the user, so a deactivated user would
+    # keep authenticating until the TTL ran out. Saves that leave
+    # is_active alone (e.g. last_login updates) keep them.
+    if created or (update_fields is not None and 'is_active' not in update_fields):
+        return
+    token_cache.evict(*Token.objects.filter(user=instance).values_list('key', flat=True))
@@ -1,3 +1,49 @@
+from unittest import mock
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from .authentication import TokenCache, token_cache
 
-# Create your tests here.
+
+class TokenCacheTests(TestCase):
+
+    def setUp(self):
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.token = Token.objects.create(user=User.objects.create_user('staff'))
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_repeat_requests_skip_the_token_query(self):
+        self.assertEqual(self.client.get('/api/import-jobs/').status_code, 200)
+        with self.assertNumQueries(1):
+            # Only counting the (empty) import job list
+            self.assertEqual(self.client.get('/api/import-jobs/').status_code, 200)
+
+    def test_deleted_token_is_evicted(self):
+        self.client.get('/api/import-jobs/')
+        self.token.delete()
+        self.assertEqual(self.client.get('/api/import-jobs/').status_code, 401)
+
+    def test_deactivated_user_is_evicted(self):
+        self.client.get('/api/import-jobs/')
+        user = self.token.user
+        user.is_active = False
+        user.save()
+        self.assertEqual(self.client.get('/api/import-jobs/').status_code, 401)
+
+    def test_least_recently_used_entries_are_dropped(self):
+        cache = TokenCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c')), (1, None, 3))
+
+    def test_entries_expire(self):
+        cache = TokenCache(maxsize=2, ttl=60)
+        with mock.patch('api_auth.authentication.time.monotonic', return_value=0):
+            cache.set('a', 1)
+        with mock.patch('api_auth.authentication.time.monotonic', return_value=61):
+            self.assertIsNone(cache.get('a'))
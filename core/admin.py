@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import School, SchoolClass, Student
+from .models import School, SchoolClass, Student, ImportJob, ClassStats
 
 @admin.register(School)
 class SchoolAdmin(admin.ModelAdmin):
@@ -11,9 +11,29 @@ class SchoolClassAdmin(admin.ModelAdmin):
     list_display = ('name', 'school', 'grade_level', 'academic_year')
     list_filter = ('school', 'grade_level', 'academic_year')
     search_fields = ('name', 'school__name')
+    list_select_related = ('school',)
 
 @admin.register(Student)
 class StudentAdmin(admin.ModelAdmin):
     list_display = ('first_name', 'last_name', 'student_id', 'school', 'school_class')
     list_filter = ('school', 'school_class')
-    search_fields = ('first_name', 'last_name', 'student_id', 'email', 'parent_name')
\ No newline at end of file
+    search_fields = ('first_name', 'last_name', 'student_id', 'email', 'parent_name')
+    # school_class is displayed through SchoolClass.__str__, which reads its school
+    list_select_related = ('school', 'school_class__school')
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'school_class':
+            kwargs['queryset'] = SchoolClass.objects.select_related('school')
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'original_name', 'status', 'rows_processed', 'students_created', 'created_at')
+    list_filter = ('status',)
+    readonly_fields = ('rows_processed', 'schools_created', 'classes_created', 'students_created', 'errors', 'started_at', 'finished_at')
+
+@admin.register(ClassStats)
+class ClassStatsAdmin(admin.ModelAdmin):
+    list_display = ('school_class', 'student_count')
+    list_select_related = ('school_class__school',)
+    readonly_fields = ('school_class', 'student_count')
@@ -0,0 +1,193 @@
+from django.db import IntegrityError, transaction
+from rest_framework import status
+from .cache import bump_version
+from .changes import log_changes
+from .importer import student_key, existing_student_keys
+from .models import Change, School, SchoolClass, Student
+from .serializers import SchoolBatchSerializer, SchoolClassBatchSerializer, StudentBatchSerializer
+from .stats import rebuild_class_stats
+
+# Largest array accepted by the batch add-* endpoints
+MAX_BATCH_SIZE = 10000
+
+
+class Batch:
+    """
+    Collects per-item results for a batch request. Items are validated
+    first; everything valid is then inserted with one bulk_create inside a
+    single transaction.
+    """
+
+    def __init__(self, items):
+        self.items = items
+        self.results = [None] * len(items)
+        self.pending = []
+
+    def error(self, index, errors):
+        if isinstance(errors, str):
+            errors = {'error': errors}
+        self.results[index] = {'index': index, 'status': 'error', 'errors': errors}
+
+    def validate(self, serializer_class):
+        """Yield (index, item, validated_data) for items that pass field validation"""
+        for index, item in enumerate(self.items):
+            if not isinstance(item, dict):
+                self.error(index, 'Each item must be a JSON object')
+                continue
+            serializer = serializer_class(data=item)
+            if not serializer.is_valid():
+                self.error(index, serializer.errors)
+                continue
+            yield index, item, serializer.validated_data
+
+    def add(self, index, obj):
+        self.pending.append((index, obj))
+
+    def save(self, model):
+        objs = [obj for _, obj in self.pending]
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(objs)
+                log_changes(model, [obj.pk for obj in objs], Change.ACTION_INSERT)
+        except IntegrityError as e:
+            # A concurrent request inserted one of the same keys; nothing was written
+            return {'error': f"Batch conflicts with existing records: {str(e)}"}, status.HTTP_409_CONFLICT
+        if objs:
+            bump_version(model)
+
+        for index, obj in self.pending:
+            self.results[index] = {'index': index, 'status': 'created', 'id': obj.pk}
+        return self.response()
+
+    def response(self):
+        created = len(self.pending)
+        if created == len(self.items):
+            code = status.HTTP_201_CREATED
+        elif created == 0:
+            code = status.HTTP_400_BAD_REQUEST
+        else:
+            code = status.HTTP_207_MULTI_STATUS
+        body = {
+            'created': created,
+            'failed': len(self.items) - created,
+            'results': self.results
+        }
+        return body, code
+
+
+def check_batch(items):
+    """Return an error (body, status) for unusable batches, else None"""
+    if not items:
+        return {'error': 'Expected a non-empty array of records'}, status.HTTP_400_BAD_REQUEST
+    if len(items) > MAX_BATCH_SIZE:
+        return {'error': f"At most {MAX_BATCH_SIZE} records can be sent in one batch"}, status.HTTP_400_BAD_REQUEST
+    return None
+
+
+def resolve_schools(items):
+    """Map every school_name referenced by the items to its id, in one query"""
+    names = {item.get('school_name') for item in items if isinstance(item, dict) and item.get('school_name')}
+    return dict(School.objects.filter(name__in=names).values_list('name', 'id'))
+
+
+def create_schools(items):
+    batch = Batch(items)
+    valid = list(batch.validate(SchoolBatchSerializer))
+
+    existing = set(School.objects.filter(
+        name__in=[data['name'] for _, _, data in valid]
+    ).values_list('name', flat=True))
+    seen = set()
+    for index, item, data in valid:
+        if data['name'] in existing or data['name'] in seen:
+            batch.error(index, {'name': ['school with this name already exists.']})
+            continue
+        seen.add(data['name'])
+        batch.add(index, School(**data))
+
+    return batch.save(School)
+
+
+def create_classes(items):
+    batch = Batch(items)
+    school_ids = resolve_schools(items)
+    valid = []
+    for index, item, data in batch.validate(SchoolClassBatchSerializer):
+        school_name = item.get('school_name')
+        if not school_name:
+            batch.error(index, 'school_name is required')
+        elif school_name not in school_ids:
+            batch.error(index, f"School '{school_name}' not found")
+        else:
+            valid.append((index, school_ids[school_name], data))
+
+    existing = set(SchoolClass.objects.filter(
+        school_id__in={school_id for _, school_id, _ in valid},
+        name__in={data['name'] for _, _, data in valid}
+    ).values_list('school_id', 'name', 'academic_year'))
+    seen = set()
+    for index, school_id, data in valid:
+        key = (school_id, data['name'], data.get('academic_year', ''))
+        if key in existing or key in seen:
+            batch.error(index, 'This class already exists in the school for that academic year')
+            continue
+        seen.add(key)
+        batch.add(index, SchoolClass(school_id=school_id, **data))
+
+    return batch.save(SchoolClass)
+
+
+def create_students(items):
+    batch = Batch(items)
+    school_ids = resolve_schools(items)
+
+    # One query for every class referenced by the batch
+    classes = {}
+    class_names = {item.get('class_name') for item in items if isinstance(item, dict) and item.get('class_name')}
+    rows = SchoolClass.objects.filter(
+        school_id__in=school_ids.values(), name__in=class_names
+    ).values_list('school_id', 'name', 'academic_year', 'id')
+    for school_id, name, academic_year, pk in rows:
+        classes.setdefault((school_id, name), []).append((academic_year or '', pk))
+
+    valid = []
+    for index, item, data in batch.validate(StudentBatchSerializer):
+        school_name = item.get('school_name')
+        class_name = item.get('class_name')
+        if not school_name:
+            batch.error(index, 'school_name is required')
+            continue
+        if not class_name:
+            batch.error(index, 'class_name is required')
+            continue
+        if school_name not in school_ids:
+            batch.error(index, f"School '{school_name}' not found")
+            continue
+
+        school_id = school_ids[school_name]
+        candidates = classes.get((school_id, class_name), [])
+        academic_year = item.get('academic_year')
+        if academic_year:
+            candidates = [c for c in candidates if c[0] == academic_year]
+        if not candidates:
+            batch.error(index, f"Class '{class_name}' not found in school '{school_name}'")
+            continue
+        # Without an academic_year the newest class of that name is used
+        class_id = max(candidates)[1]
+
+        key = student_key(data['first_name'], data['last_name'], data.get('student_id') or '', school_id, class_id)
+        valid.append((index, key, Student(school_id=school_id, school_class_id=class_id, **data)))
+
+    existing = existing_student_keys({key for _, key, _ in valid})
+    seen = set()
+    for index, key, obj in valid:
+        if key in existing or key in seen:
+            batch.error(index, 'This student already exists in the school')
+            continue
+        seen.add(key)
+        batch.add(index, obj)
+
+    response = batch.save(Student)
+    # bulk_create skips the signals that keep the class counts current
+    rebuild_class_stats({obj.school_id for _, obj in batch.pending})
+    return response
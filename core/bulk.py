@@ -0,0 +1,145 @@
+import re
+from django.db import transaction
+from django.db.models import Case, Count, Value, When
+from django.utils import timezone
+from .cache import bump_version
+from .changes import log_changes
+from .models import Change, SchoolClass, Student
+from .signals import muted_signals
+from .stats import rebuild_class_stats
+
+# Set-based operations behind the bulk endpoints. Each runs as one UPDATE,
+# or batched DELETEs, inside a single transaction; the class counts are
+# recounted, the change log written and the cached responses invalidated
+# once afterwards, instead of by the per-row signals.
+
+# Students deleted per DELETE; QuerySet.delete() loads each batch to send its signals
+DELETE_BATCH_SIZE = 1000
+
+
+def move_students(students, school_class):
+    """Move every student of the queryset into ``school_class`` and return how many moved"""
+    with transaction.atomic():
+        school_ids = set(students.values_list('school_id', flat=True).distinct())
+        ids = list(students.values_list('pk', flat=True))
+        # The class decides the school, so moves across schools keep both in step
+        moved = students.order_by().update(
+            school_class_id=school_class.pk, school_id=school_class.school_id, updated_at=timezone.now()
+        )
+        log_changes(Student, ids, Change.ACTION_UPDATE)
+        rebuild_class_stats(school_ids | {school_class.school_id})
+        transaction.on_commit(lambda: bump_version(Student))
+    return moved
+
+
+def delete_students(students):
+    """Delete every student of the queryset and return how many were deleted"""
+    with transaction.atomic():
+        school_ids = set(students.values_list('school_id', flat=True).distinct())
+        ids = list(students.values_list('pk', flat=True))
+        deleted = 0
+        with muted_signals():
+            for start in range(0, len(ids), DELETE_BATCH_SIZE):
+                batch = Student.objects.filter(pk__in=ids[start:start + DELETE_BATCH_SIZE])
+                deleted += batch.delete()[1].get(Student._meta.label, 0)
+        log_changes(Student, ids, Change.ACTION_DELETE)
+        rebuild_class_stats(school_ids)
+        transaction.on_commit(lambda: bump_version(Student))
+    return deleted
+
+
+def next_grade(grade_level):
+    """The grade after ``grade_level`` if it is a number, else None"""
+    try:
+        return str(int(grade_level) + 1)
+    except (TypeError, ValueError):
+        return None
+
+
+def promoted_class_name(name, grade_level, to_grade_level):
+    """Name of a class a year on: the grade in it is replaced, so 9A becomes 10A and Blue stays Blue"""
+    pattern = rf'(?<!\d){re.escape(grade_level)}(?!\d)'
+    return re.sub(pattern, lambda match: to_grade_level, name, count=1)
+
+
+def promote_grade(grade_level, academic_year, to_academic_year, to_grade_level=None,
+                  school=None, create=False, archive=True):
+    """
+    Year-end rollover of one grade: the students of every class of
+    ``grade_level`` in ``academic_year`` (optionally of one school) move to
+    the class of the same school in ``to_academic_year`` named as
+    promoted_class_name() gives, which is created if ``create`` is set.
+    The emptied classes are archived unless ``archive`` is False.
+
+    All students move in a single UPDATE. Raises ValueError if there is
+    nothing to promote or a target class is missing.
+    """
+    to_grade_level = to_grade_level or next_grade(grade_level)
+    if to_grade_level is None:
+        raise ValueError(f"Grade '{grade_level}' is not a number; pass to_grade_level")
+
+    sources = SchoolClass.objects.filter(grade_level=grade_level, academic_year=academic_year)
+    if school is not None:
+        sources = sources.filter(school_id=school)
+
+    with transaction.atomic():
+        sources = list(sources.values_list('id', 'school_id', 'name'))
+        if not sources:
+            raise ValueError(f"No grade {grade_level} classes in {academic_year}")
+        school_ids = {school_id for _, school_id, _ in sources}
+
+        def find_targets():
+            return {
+                (school_id, name): pk
+                for pk, school_id, name in SchoolClass.objects.filter(
+                    school_id__in=school_ids, academic_year=to_academic_year
+                ).values_list('id', 'school_id', 'name')
+            }
+
+        targets = find_targets()
+        wanted = {
+            pk: (school_id, promoted_class_name(name, grade_level, to_grade_level))
+            for pk, school_id, name in sources
+        }
+        missing = sorted(set(wanted.values()) - set(targets))
+        if missing and not create:
+            names = ', '.join(f"'{name}' (school {school_id})" for school_id, name in missing)
+            raise ValueError(f"No {to_academic_year} class {names}; pass create to add them")
+        if missing:
+            created = SchoolClass.objects.bulk_create([
+                SchoolClass(school_id=school_id, name=name, grade_level=to_grade_level, academic_year=to_academic_year)
+                for school_id, name in missing
+            ])
+            log_changes(SchoolClass, [obj.pk for obj in created], Change.ACTION_INSERT)
+            targets = find_targets()
+        mapping = {pk: targets[key] for pk, key in wanted.items()}
+
+        counts = dict(
+            Student.objects.filter(school_class_id__in=mapping)
+            .values('school_class_id').annotate(n=Count('id')).values_list('school_class_id', 'n')
+        )
+        now = timezone.now()
+        students = Student.objects.filter(school_class_id__in=mapping)
+        ids = list(students.values_list('pk', flat=True))
+        promoted = students.update(
+            school_class_id=Case(*[When(school_class_id=source, then=Value(target))
+                                   for source, target in mapping.items()]),
+            updated_at=now
+        )
+        log_changes(Student, ids, Change.ACTION_UPDATE)
+        archived = 0
+        if archive:
+            archived = SchoolClass.objects.filter(pk__in=mapping).update(archived=True, updated_at=now)
+            log_changes(SchoolClass, list(mapping), Change.ACTION_UPDATE)
+        rebuild_class_stats(school_ids)
+        transaction.on_commit(lambda: bump_version(Student, SchoolClass))
+
+    return {
+        'promoted': promoted,
+        'classes_created': len(missing),
+        'classes_archived': archived,
+        'classes': [
+            {'from': source, 'to': target, 'students': counts.get(source, 0)}
+            for source, target in mapping.items()
+        ],
+    }
@@ -0,0 +1,99 @@
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+# Cache alias holding cached API responses and the model version counters
+CACHE_ALIAS = 'api'
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _version_key(model):
+    return f'version:{model._meta.label_lower}'
+
+
+def get_versions(models):
+    """
+    Current version of each model. Versions are millisecond timestamps of
+    the last write, so a version lost from the cache restarts at "now" and
+    can never collide with one that was used before.
+    """
+    cache = _cache()
+    keys = [_version_key(model) for model in models]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        if key not in found:
+            found[key] = int(time.time() * 1000)
+            cache.set(key, found[key], None)
+        versions.append(found[key])
+    return versions
+
+
+def bump_version(*models):
+    """
+    Invalidate cached responses built from these models. Called from the
+    model signals and from bulk writes (bulk_create, bulk_update, update)
+    that bypass them.
+    """
+    cache = _cache()
+    now = int(time.time() * 1000)
+    for model in models:
+        key = _version_key(model)
+        current = cache.get(key) or 0
+        cache.set(key, max(now, current + 1), None)
+
+
+class CachedResponseMixin:
+    """
+    Caches list and retrieve responses of a viewset. Entries are keyed on
+    the path, query string and the versions of ``cache_models``, so any
+    write to those models makes them unreachable. Responses carry an ETag
+    and Last-Modified, and matching conditional requests get a 304 without
+    touching the database.
+    """
+    cache_models = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        versions = get_versions(self.cache_models)
+        raw_key = f"{request.get_host()}|{request.get_full_path()}|{versions}"
+        key = 'response:' + hashlib.sha1(raw_key.encode()).hexdigest()
+        etag = f'"{key[9:]}"'
+        last_modified = max(versions) // 1000
+
+        if self.not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            cached = _cache().get(key)
+            if cached is not None:
+                response = Response(cached)
+            else:
+                response = handler(request, *args, **kwargs)
+                if response.status_code == status.HTTP_200_OK:
+                    _cache().set(key, response.data, settings.API_CACHE_TIMEOUT)
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        # Clients may keep the response but must revalidate it every time
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def not_modified(self, request, etag, last_modified):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            etags = [tag[2:] if tag.startswith('W/') else tag for tag in parse_etags(if_none_match)]
+            return '*' in etags or etag in etags
+        if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        return if_modified_since is not None and last_modified <= if_modified_since
@@ -0,0 +1,98 @@
+import json
+from datetime import timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from .models import Change, School, SchoolClass, Student
+
+# Entity name of each logged model, as used by ?entity= on export and import
+ENTITY_MODELS = {
+    'schools': School,
+    'classes': SchoolClass,
+    'students': Student,
+}
+MODEL_ENTITIES = {model: entity for entity, model in ENTITY_MODELS.items()}
+
+# Changes read per query while streaming the feed
+CHUNK_SIZE = 1000
+
+# Changes younger than this are held back. Their ids are assigned before
+# the writing transaction commits, so a slow transaction (an import chunk)
+# can commit a lower id after a client has already read past it.
+FEED_DELAY = timedelta(seconds=getattr(settings, 'CHANGE_FEED_DELAY_SECONDS', 30))
+
+
+def log_change(model, pk, action):
+    Change.objects.create(entity=MODEL_ENTITIES[model], object_id=pk, action=action)
+
+
+def log_changes(model, ids, action):
+    """Record one change per id, for bulk writes that bypass the model signals"""
+    entity = MODEL_ENTITIES[model]
+    Change.objects.bulk_create(
+        [Change(entity=entity, object_id=pk, action=action) for pk in ids],
+        batch_size=CHUNK_SIZE
+    )
+
+
+def _fields(model):
+    # Same keys as the API serializers: foreign keys by field name, holding the id
+    return [field.name for field in model._meta.concrete_fields]
+
+
+def stream_changes(since=0, entity=None):
+    """
+    Yield NDJSON lines for every change after cursor ``since``, oldest first.
+
+    Inserts and updates carry the row as it is now, so only the last change
+    of an object within a chunk is sent; rows deleted since are skipped in
+    favour of their tombstone, a delete with ``data`` null. Clients store
+    the last ``cursor`` they applied and pass it back as ``since``.
+    """
+    changes = Change.objects.order_by('id')
+    if entity:
+        changes = changes.filter(entity=entity)
+    cutoff = timezone.now() - FEED_DELAY
+
+    while True:
+        chunk = list(
+            changes.filter(id__gt=since).values_list('id', 'entity', 'object_id', 'action', 'changed_at')[:CHUNK_SIZE]
+        )
+        # Stop at the first change that is too recent, never skip past it
+        for index, change in enumerate(chunk):
+            if change[4] > cutoff:
+                chunk = chunk[:index]
+                break
+        if not chunk:
+            return
+
+        last = {(change[1], change[2]): change[0] for change in chunk}
+        rows = {}
+        for name, model in ENTITY_MODELS.items():
+            ids = [object_id for (change_entity, object_id) in last if change_entity == name]
+            if ids:
+                for row in model.objects.filter(pk__in=ids).values(*_fields(model)):
+                    rows[(name, row['id'])] = row
+
+        for cursor, change_entity, object_id, action, changed_at in chunk:
+            key = (change_entity, object_id)
+            if last[key] != cursor:
+                continue
+            data = None
+            if action != Change.ACTION_DELETE:
+                data = rows.get(key)
+                if data is None:
+                    # Deleted since; a later tombstone reports it
+                    continue
+            yield json.dumps({
+                'cursor': cursor,
+                'entity': change_entity,
+                'action': action,
+                'id': object_id,
+                'changed_at': changed_at,
+                'data': data,
+            }, cls=DjangoJSONEncoder) + '\n'
+
+        since = chunk[-1][0]
+        if len(chunk) < CHUNK_SIZE:
+            return
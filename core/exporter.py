@@ -0,0 +1,106 @@
+import csv
+import json
+import tempfile
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from .models import School, SchoolClass, Student
+
+# Rows fetched per round trip from the server-side cursor
+CHUNK_SIZE = 2000
+
+# Export layout per sheet: (column header, queryset field). The headers
+# match generate_template.py so an export can be imported again as-is.
+EXPORT_COLUMNS = {
+    'Schools': [
+        ('name', 'name'),
+        ('address', 'address'),
+        ('phone', 'phone'),
+        ('email', 'email'),
+    ],
+    'Classes': [
+        ('school_name', 'school__name'),
+        ('name', 'name'),
+        ('grade_level', 'grade_level'),
+        ('academic_year', 'academic_year'),
+    ],
+    'Students': [
+        ('first_name', 'first_name'),
+        ('last_name', 'last_name'),
+        ('student_id', 'student_id'),
+        ('date_of_birth', 'date_of_birth'),
+        ('school_name', 'school__name'),
+        ('class_name', 'school_class__name'),
+        # Class names repeat across years, so the importer needs both
+        ('academic_year', 'school_class__academic_year'),
+        ('email', 'email'),
+        ('address', 'address'),
+        ('parent_name', 'parent_name'),
+        ('parent_contact', 'parent_contact'),
+    ],
+}
+
+EXPORT_MODELS = {
+    'Schools': School,
+    'Classes': SchoolClass,
+    'Students': Student,
+}
+
+
+def export_headers(sheet):
+    return [header for header, _ in EXPORT_COLUMNS[sheet]]
+
+
+def export_rows(sheet):
+    """
+    Yield raw value tuples for a sheet. values_list skips model
+    instantiation and iterator() streams from a server-side cursor.
+    """
+    fields = [field for _, field in EXPORT_COLUMNS[sheet]]
+    queryset = EXPORT_MODELS[sheet].objects.order_by('id').values_list(*fields)
+    return queryset.iterator(chunk_size=CHUNK_SIZE)
+
+
+class Echo:
+    """File-like object whose write() hands back the value for streaming"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(sheet):
+    writer = csv.writer(Echo())
+    yield writer.writerow(export_headers(sheet))
+    for row in export_rows(sheet):
+        yield writer.writerow(['' if value is None else value for value in row])
+
+
+def stream_ndjson(sheet):
+    headers = export_headers(sheet)
+    for row in export_rows(sheet):
+        yield json.dumps(dict(zip(headers, row)), default=str) + '\n'
+
+
+def build_xlsx():
+    """
+    Write all three sheets into a temporary .xlsx file and return it,
+    rewound. openpyxl's write-only mode flushes rows to disk as it goes.
+    """
+    workbook = Workbook(write_only=True)
+    header_font = Font(bold=True)
+
+    for sheet in EXPORT_COLUMNS:
+        worksheet = workbook.create_sheet(title=sheet)
+        header = []
+        for title in export_headers(sheet):
+            cell = WriteOnlyCell(worksheet, value=title)
+            cell.font = header_font
+            header.append(cell)
+        worksheet.append(header)
+        for row in export_rows(sheet):
+            worksheet.append(row)
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
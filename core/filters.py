@@ -0,0 +1,41 @@
+import django_filters
+from rest_framework.filters import OrderingFilter
+from .models import School, SchoolClass, Student
+
+
+class StableOrderingFilter(OrderingFilter):
+    """OrderingFilter that always ends on id, so equal values page deterministically"""
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering and not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering = list(ordering) + ['id']
+        return ordering
+
+
+# Every filter below is backed by an index declared on the model (or the
+# foreign key index Django creates), see core/models.py.
+
+class SchoolFilter(django_filters.FilterSet):
+    class Meta:
+        model = School
+        fields = ['name']
+
+
+class SchoolClassFilter(django_filters.FilterSet):
+    school_name = django_filters.CharFilter(field_name='school__name')
+
+    class Meta:
+        model = SchoolClass
+        fields = ['school', 'school_name', 'name', 'grade_level', 'academic_year', 'archived']
+
+
+class StudentFilter(django_filters.FilterSet):
+    school_name = django_filters.CharFilter(field_name='school__name')
+
+    class Meta:
+        model = Student
+        fields = [
+            'school', 'school_name', 'school_class', 'student_id',
+            'school_class__grade_level', 'school_class__academic_year'
+        ]
@@ -0,0 +1,770 @@
+import itertools
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from contextlib import contextmanager
+from django.conf import settings
+from django.core import signing
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+import pandas as pd
+from .cache import bump_version
+from .changes import log_changes
+from .models import Change, School, SchoolClass, Student, ImportJob
+from .pipeline import run_pipeline
+from .stats import rebuild_class_stats
+from .workbook_cache import open_sheets
+
+logger = logging.getLogger(__name__)
+
+# Rows written and committed per transaction (one checkpoint each)
+BATCH_SIZE = getattr(settings, 'IMPORT_CHUNK_SIZE', 1000)
+
+# Import modes: create only adds new rows, upsert also updates changed ones
+MODE_CREATE = 'create'
+MODE_UPSERT = 'upsert'
+MODES = [MODE_CREATE, MODE_UPSERT]
+
+# Fields compared and updated in upsert mode
+SCHOOL_FIELDS = ['address', 'phone', 'email']
+CLASS_FIELDS = ['grade_level']
+STUDENT_FIELDS = [
+    'first_name', 'last_name', 'date_of_birth', 'school_class', 'email',
+    'address', 'parent_name', 'parent_contact'
+]
+
+# Sheet column each upserted field is read from, where the names differ
+FIELD_COLUMNS = {
+    'school_class': 'class_name',
+}
+
+# Salt of the signed tokens used to resume failed imports
+RESUME_SALT = 'core.importer.resume'
+
+# Running jobs without a heartbeat for this long were orphaned by a dead worker
+STALE_AFTER = timedelta(seconds=getattr(settings, 'IMPORT_STALE_SECONDS', 15 * 60))
+MAX_ATTEMPTS = getattr(settings, 'IMPORT_MAX_ATTEMPTS', 3)
+
+# ImportJob fields refreshed after every batch
+PROGRESS_FIELDS = [
+    'rows_processed', 'schools_created', 'classes_created', 'students_created',
+    'schools_updated', 'classes_updated', 'students_updated', 'rows_unchanged', 'errors',
+    'checkpoint', 'heartbeat_at'
+]
+
+
+def is_blank(value):
+    """Return True for missing cells (None, NaN or empty string)"""
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return value == ''
+    try:
+        return bool(pd.isna(value))
+    except (TypeError, ValueError):
+        return False
+
+
+def clean_value(value):
+    """Normalise a cell value for a text column"""
+    if is_blank(value):
+        return ''
+    # Excel stores numeric ids as floats, e.g. 12345.0
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return value if isinstance(value, str) else str(value)
+
+
+def parse_date(value):
+    """Parse a date cell, returning None for blanks"""
+    if is_blank(value):
+        return None
+    # Excel cells arrive as datetimes and CSV/NDJSON exports as ISO strings;
+    # only other formats need the much slower pandas parser
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            pass
+    return pd.to_datetime(value).date()
+
+
+def batched(rows, size):
+    """Yield lists of at most ``size`` rows from any iterable"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def student_key(first_name, last_name, student_id, school_id, class_id):
+    """
+    Natural key of a student row. Students with an id are unique per school
+    (enforced by the unique_student_id_per_school constraint); students
+    without one are matched on name and class.
+    """
+    if student_id:
+        return ('id', school_id, student_id)
+    return ('name', school_id, class_id, first_name, last_name)
+
+
+def find_students(keys, fields=()):
+    """
+    Look up existing students by natural key in at most two queries.
+    Returns a dict of key -> (id, *fields) for the keys that exist.
+    """
+    ids = [key for key in keys if key[0] == 'id']
+    names = [key for key in keys if key[0] == 'name']
+    found = {}
+
+    if ids:
+        # student_id__gt='' matches the partial unique index's condition
+        rows = Student.objects.filter(
+            school_id__in={key[1] for key in ids},
+            student_id__in={key[2] for key in ids},
+            student_id__gt=''
+        ).values_list('school_id', 'student_id', 'id', *fields)
+        for row in rows:
+            found[('id',) + row[:2]] = row[2:]
+
+    if names:
+        rows = Student.objects.filter(
+            Q(student_id='') | Q(student_id__isnull=True),
+            school_class_id__in={key[2] for key in names}
+        ).values_list('school_id', 'school_class_id', 'first_name', 'last_name', 'id', *fields)
+        for row in rows:
+            found[('name',) + row[:4]] = row[4:]
+
+    return found
+
+
+def existing_student_keys(keys):
+    """Return which of the given student keys already exist"""
+    return set(find_students(keys))
+
+
+def _normalise(value):
+    # None and '' compare the same
+    return '' if value is None else str(value)
+
+
+class ImportEngine:
+    """
+    Set-based importer for the Schools, Classes and Students sheets.
+
+    Schools and classes are resolved once into in-memory name -> id maps,
+    incoming rows are diffed against existing natural keys a batch at a time
+    and new rows are written with chunked bulk_create.
+
+    In upsert mode rows that already exist are compared field by field and
+    only the fields that changed are written, with bulk_update. Fields whose
+    column the sheet lacks are left as stored rather than blanked.
+
+    Each batch is written in one transaction, together with the progress
+    callback, so a saved ``checkpoint`` (sheet and rows done per writer
+    partition) always matches what is committed and can be resumed from.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, progress=None, mode=MODE_CREATE, checkpoint=None):
+        self.batch_size = batch_size
+        # Optional callable invoked with the engine after every batch
+        self.progress = progress
+        self.mode = mode
+        self.rows_processed = 0
+        self.results = {
+            'schools_created': 0,
+            'classes_created': 0,
+            'students_created': 0,
+            'errors': []
+        }
+        if mode == MODE_UPSERT:
+            self.results.update({
+                'schools_updated': 0,
+                'classes_updated': 0,
+                'students_updated': 0,
+                'unchanged': 0
+            })
+        self._school_ids = None
+        self._class_ids = None
+        self._class_by_name = None
+        self._class_names = None
+        self._classes_named = None
+        # Columns of the sheet being imported; None compares every field
+        self.columns = None
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        # Where a previous run stopped: {'sheet': name, 'offsets': [rows done per partition]}
+        self.resume_from = checkpoint or None
+        self.checkpoint = dict(checkpoint or {})
+
+    @property
+    def upsert(self):
+        return self.mode == MODE_UPSERT
+
+    def _count(self, key, n=1):
+        # Counts are kept per writer thread until its batch commits, so the
+        # saved progress never includes another writer's uncommitted rows
+        counts = self._local.__dict__.setdefault('counts', {})
+        counts[key] = counts.get(key, 0) + n
+
+    def _error(self, message):
+        # Staged like the counts: a batch that rolls back reports nothing,
+        # so resuming it does not report its row errors twice
+        self._local.__dict__.setdefault('errors', []).append(message)
+
+    @contextmanager
+    def _chunk(self, batch, partition):
+        """Write one batch and its checkpoint in a single transaction"""
+        self._local.counts = {}
+        self._local.errors = []
+        with transaction.atomic():
+            yield
+            # Writer threads in core.pipeline share one engine
+            with self._lock:
+                for key, n in self._local.counts.items():
+                    self.results[key] += n
+                self.results['errors'].extend(self._local.errors)
+                self.rows_processed += len(batch)
+                if self.checkpoint:
+                    self.checkpoint['offsets'][partition] += len(batch)
+                if self.progress is not None:
+                    self.progress(self)
+
+    def start_sheet(self, sheet, partitions, offsets=None, columns=None):
+        """Record the sheet being imported as the checkpoint to resume from"""
+        with self._lock:
+            self.columns = set(columns) if columns is not None else None
+            self.checkpoint = {'sheet': sheet, 'offsets': list(offsets or [0] * partitions)}
+            if self.progress is not None:
+                self.progress(self)
+
+    def sheet_fields(self, fields):
+        """The upserted ``fields`` whose column the current sheet has"""
+        if self.columns is None:
+            return fields
+        return [field for field in fields if FIELD_COLUMNS.get(field, field) in self.columns]
+
+    @property
+    def school_ids(self):
+        """Map of school name -> id"""
+        if self._school_ids is None:
+            self._school_ids = dict(School.objects.values_list('name', 'id'))
+        return self._school_ids
+
+    @property
+    def class_ids(self):
+        """Map of (school_id, class name, academic_year) -> id"""
+        if self._class_ids is None:
+            self._class_ids = {}
+            self._class_by_name = {}
+            self._class_names = {}
+            self._classes_named = {}
+            classes = SchoolClass.objects.values_list('school_id', 'name', 'academic_year', 'id')
+            for school_id, name, academic_year, pk in classes:
+                self._add_class(school_id, name, academic_year, pk)
+        return self._class_ids
+
+    def _add_class(self, school_id, name, academic_year, pk):
+        academic_year = academic_year or ''
+        self._class_ids[(school_id, name, academic_year)] = pk
+        self._class_names[pk] = (school_id, name)
+        self._classes_named.setdefault((school_id, name), []).append(pk)
+        # Students reference classes by name only, so keep the latest year
+        current = self._class_by_name.get((school_id, name))
+        if current is None or current[0] < academic_year:
+            self._class_by_name[(school_id, name)] = (academic_year, pk)
+
+    def class_id_for(self, school_id, name):
+        """Return the id of the newest class with this name in a school"""
+        self.class_ids
+        match = self._class_by_name.get((school_id, name))
+        return match[1] if match else None
+
+    def _bulk_create(self, model, objs, describe):
+        """
+        Insert objs with one bulk_create. If the batch fails, fall back to
+        saving row by row so each failure is reported against its own row.
+        Returns the list of objects that were saved.
+        """
+        if not objs:
+            return []
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(objs, batch_size=self.batch_size)
+                # PostgreSQL and SQLite return the new ids from bulk_create
+                log_changes(model, [obj.pk for obj in objs], Change.ACTION_INSERT)
+            return objs
+        except Exception:
+            pass
+
+        saved = []
+        for obj in objs:
+            obj.pk = None
+            try:
+                with transaction.atomic():
+                    obj.save(force_insert=True)
+                saved.append(obj)
+            except Exception as e:
+                self._error(f"{describe(obj)}: {str(e)}")
+        return saved
+
+    def _bulk_update(self, model, objs, fields, describe):
+        """bulk_update counterpart of _bulk_create. Returns the number saved."""
+        # bulk_update only sets auto_now fields that are listed
+        now = timezone.now()
+        for obj in objs:
+            obj.updated_at = now
+        fields = fields + ['updated_at']
+        try:
+            with transaction.atomic():
+                model.objects.bulk_update(objs, fields, batch_size=self.batch_size)
+                log_changes(model, [obj.pk for obj in objs], Change.ACTION_UPDATE)
+            return len(objs)
+        except Exception:
+            pass
+
+        saved = 0
+        for obj in objs:
+            try:
+                with transaction.atomic():
+                    obj.save(update_fields=fields)
+                saved += 1
+            except Exception as e:
+                self._error(f"{describe(obj)}: {str(e)}")
+        return saved
+
+    def _write(self, model, label, pending, existing, fields, describe):
+        """
+        Create the pending objects whose key is not in ``existing``. In
+        upsert mode ``existing`` maps key -> (id, *fields) and rows with
+        fields that differ get those fields updated.
+        Returns the list of created objects.
+        """
+        updated = 0
+        if self.upsert:
+            updated = self._update(model, label, pending, existing, fields, describe)
+
+        new = [obj for key, obj in pending.items() if key not in existing]
+        saved = self._bulk_create(model, new, lambda obj: f"Error creating {describe(obj)}")
+        self._count(f'{label}_created', len(saved))
+        if saved or updated:
+            # Bulk writes skip model signals, so expire cached responses here
+            transaction.on_commit(lambda: bump_version(model))
+        return saved
+
+    def _update(self, model, label, pending, existing, fields, describe):
+        attnames = [model._meta.get_field(field).attname for field in fields]
+        # Rows are grouped by the set of fields that changed, so each
+        # bulk_update only writes columns that actually differ
+        groups = {}
+        for key, obj in pending.items():
+            stored = existing.get(key)
+            if stored is None:
+                continue
+            incoming = [getattr(obj, attname) for attname in attnames]
+            changed = tuple(
+                field for field, old, new in zip(fields, stored[1:], incoming)
+                if _normalise(old) != _normalise(new)
+            )
+            if not changed:
+                self._count('unchanged')
+                continue
+            obj.pk = stored[0]
+            groups.setdefault(changed, []).append(obj)
+
+        total = 0
+        for changed, objs in groups.items():
+            updated = self._bulk_update(
+                model, objs, list(changed), lambda obj: f"Error updating {describe(obj)}"
+            )
+            self._count(f'{label}_updated', updated)
+            total += updated
+        return total
+
+    def import_schools(self, rows, partition=0):
+        for batch in batched(rows, self.batch_size):
+            with self._chunk(batch, partition):
+                pending = {}
+                for row in batch:
+                    name = row.get('name')
+                    if is_blank(name):
+                        continue
+                    name = clean_value(name)
+                    if name in pending or (name in self.school_ids and not self.upsert):
+                        continue
+                    pending[name] = School(
+                        name=name,
+                        address=clean_value(row.get('address')),
+                        phone=clean_value(row.get('phone')),
+                        email=clean_value(row.get('email'))
+                    )
+
+                fields = self.sheet_fields(SCHOOL_FIELDS)
+                existing = self.school_ids
+                if self.upsert and pending:
+                    existing = {
+                        row[0]: row[1:]
+                        for row in School.objects.filter(name__in=pending).values_list('name', 'id', *fields)
+                    }
+
+                saved = self._write(School, 'schools', pending, existing, fields,
+                                    lambda obj: f"school {obj.name}")
+                if saved:
+                    names = [obj.name for obj in saved]
+                    self.school_ids.update(
+                        School.objects.filter(name__in=names).values_list('name', 'id')
+                    )
+
+    def import_classes(self, rows, partition=0):
+        for batch in batched(rows, self.batch_size):
+            with self._chunk(batch, partition):
+                pending = {}
+                for row in batch:
+                    name = row.get('name')
+                    school_name = row.get('school_name')
+                    if is_blank(name) or is_blank(school_name):
+                        continue
+                    name = clean_value(name)
+                    school_name = clean_value(school_name)
+
+                    school_id = self.school_ids.get(school_name)
+                    if school_id is None:
+                        self._error(f"School '{school_name}' does not exist for class '{name}'")
+                        continue
+
+                    academic_year = clean_value(row.get('academic_year'))
+                    key = (school_id, name, academic_year)
+                    if key in pending or (key in self.class_ids and not self.upsert):
+                        continue
+                    pending[key] = SchoolClass(
+                        name=name,
+                        school_id=school_id,
+                        grade_level=clean_value(row.get('grade_level')),
+                        academic_year=academic_year
+                    )
+
+                fields = self.sheet_fields(CLASS_FIELDS)
+                existing = self.class_ids
+                if self.upsert and pending:
+                    rows = SchoolClass.objects.filter(
+                        school_id__in={key[0] for key in pending},
+                        name__in={key[1] for key in pending}
+                    ).values_list('school_id', 'name', 'academic_year', 'id', *fields)
+                    existing = {(row[0], row[1], row[2] or ''): row[3:] for row in rows}
+
+                saved = self._write(SchoolClass, 'classes', pending, existing, fields,
+                                    lambda obj: f"class {obj.name}")
+                if saved:
+                    created = SchoolClass.objects.filter(
+                        school_id__in={obj.school_id for obj in saved},
+                        name__in={obj.name for obj in saved}
+                    ).values_list('school_id', 'name', 'academic_year', 'id')
+                    for school_id, name, academic_year, pk in created:
+                        self._add_class(school_id, name, academic_year, pk)
+
+    def _find_students(self, pending, yearless, fields):
+        """
+        find_students() for a batch, where rows that name no academic year
+        match the student in any class of that name instead of moving them
+        to the newest one.
+        """
+        # Name keys include the class, so also look them up in the
+        # other classes with the same name
+        aliases = {}
+        for key in yearless:
+            if key[0] != 'name':
+                continue
+            for pk in self._classes_named[self._class_names[key[2]]]:
+                if pk != key[2]:
+                    aliases[key[:2] + (pk,) + key[3:]] = key
+        existing = find_students([*pending, *aliases], fields)
+        for alias, key in aliases.items():
+            if alias in existing:
+                stored = existing.pop(alias)
+                if key not in existing:
+                    existing[key] = stored
+                    pending[key].school_class_id = alias[2]
+
+        if 'school_class' in fields:
+            index = fields.index('school_class') + 1
+            for key in yearless:
+                stored = existing.get(key)
+                obj = pending[key]
+                if stored and self._class_names.get(stored[index]) == self._class_names[obj.school_class_id]:
+                    obj.school_class_id = stored[index]
+        return existing
+
+    def import_students(self, rows, partition=0):
+        for batch in batched(rows, self.batch_size):
+            with self._chunk(batch, partition):
+                pending = {}
+                yearless = set()
+                for row in batch:
+                    first_name = row.get('first_name')
+                    last_name = row.get('last_name')
+                    if is_blank(first_name) or is_blank(last_name):
+                        continue
+                    first_name = clean_value(first_name)
+                    last_name = clean_value(last_name)
+                    school_name = clean_value(row.get('school_name'))
+                    class_name = clean_value(row.get('class_name'))
+                    # Optional column; without it the newest class of that name is used
+                    academic_year = clean_value(row.get('academic_year'))
+
+                    try:
+                        school_id = self.school_ids.get(school_name)
+                        if school_id is None:
+                            self._error(f"School '{school_name}' does not exist for student '{first_name} {last_name}'")
+                            continue
+
+                        if academic_year:
+                            class_id = self.class_ids.get((school_id, class_name, academic_year))
+                            class_label = f"{class_name} ({academic_year})"
+                        else:
+                            class_id = self.class_id_for(school_id, class_name)
+                            class_label = class_name
+                        if class_id is None:
+                            self._error(f"Class '{class_label}' does not exist in school '{school_name}' for student '{first_name} {last_name}'")
+                            continue
+
+                        student_id = clean_value(row.get('student_id'))
+                        key = student_key(first_name, last_name, student_id, school_id, class_id)
+                        if key in pending:
+                            continue
+                        if not academic_year:
+                            yearless.add(key)
+                        pending[key] = Student(
+                            first_name=first_name,
+                            last_name=last_name,
+                            student_id=student_id,
+                            date_of_birth=parse_date(row.get('date_of_birth')),
+                            school_id=school_id,
+                            school_class_id=class_id,
+                            email=clean_value(row.get('email')),
+                            address=clean_value(row.get('address')),
+                            parent_name=clean_value(row.get('parent_name')),
+                            parent_contact=clean_value(row.get('parent_contact'))
+                        )
+                    except Exception as e:
+                        self._error(f"Error creating student {first_name} {last_name}: {str(e)}")
+
+                if pending:
+                    # Existing natural keys (and their stored values when upserting)
+                    fields = self.sheet_fields(STUDENT_FIELDS)
+                    existing = self._find_students(pending, yearless, fields if self.upsert else ())
+                    self._write(Student, 'students', pending, existing, fields,
+                                lambda obj: f"student {obj.first_name} {obj.last_name}")
+
+
+def writer_threads():
+    """Number of import writer threads; SQLite only allows one writer"""
+    if connection.vendor == 'sqlite':
+        return 1
+    return max(1, getattr(settings, 'IMPORT_WRITER_THREADS', 1))
+
+
+def import_workbook(file, engine=None, writers=None, cache_key=None, name=None, entity=None):
+    """
+    Import the Schools, Classes and Students sheets of an Excel file, or
+    the CSV, TSV or NDJSON files of a zip or a single entity. ``name`` is
+    the original file name, which selects the format (see core.readers).
+
+    Rows are streamed from the file on this thread and written a batch
+    at a time by writer threads partitioned by school (see core.pipeline).
+    Each sheet finishes before the next starts, so schools exist before
+    their classes and classes before their students.
+    Errors reading the file itself are raised to the caller.
+
+    If the engine has a checkpoint to resume from, earlier sheets and the
+    rows already committed in each partition of its sheet are skipped.
+
+    ``cache_key`` is the file's content hash: the sheets parsed by an
+    earlier import of the same file are read from the workbook cache
+    instead of the file (see core.workbook_cache).
+    """
+    engine = engine or ImportEngine()
+    writers = writers or writer_threads()
+    resume = engine.resume_from
+
+    name = name or getattr(file, 'name', None) or str(file)
+    workbook = open_sheets(file, name, cache_key, entity)
+    try:
+        logger.info('Sheets in file: %s', workbook.sheetnames)
+
+        # Load the lookup maps once, before writer threads share them
+        engine.school_ids
+        engine.class_ids
+
+        # Sheets are processed in dependency order: schools, classes, students
+        sheets = [
+            ('Schools', engine.import_schools, 'name'),
+            ('Classes', engine.import_classes, 'school_name'),
+            ('Students', engine.import_students, 'school_name'),
+        ]
+        for sheet, write, partition_key in sheets:
+            if resume and sheet != resume['sheet']:
+                continue
+            skip = None
+            if resume:
+                # Rows are only skipped correctly with the original partitioning
+                skip = resume['offsets']
+                resume = None
+            if sheet in workbook.sheetnames:
+                partitions = len(skip) if skip else writers
+                # The header is read from the first row: upserts leave the
+                # fields of columns the sheet lacks untouched
+                rows = workbook.rows(sheet)
+                first = next(rows, None)
+                if first is not None:
+                    rows = itertools.chain([first], rows)
+                engine.start_sheet(sheet, partitions, skip, list(first or ()))
+                run_pipeline(
+                    rows, write,
+                    partition_key=partition_key, writers=partitions,
+                    batch_size=engine.batch_size, skip=skip
+                )
+        engine.checkpoint = {}
+        # Bulk writes skip the signals that keep the class counts current
+        rebuild_class_stats()
+    finally:
+        workbook.close()
+
+    return engine.results
+
+
+def resume_token(job):
+    """Signed token that requeues a failed job from its checkpoint"""
+    return signing.dumps({'job': job.pk}, salt=RESUME_SALT)
+
+
+def stale_jobs():
+    """Running jobs whose worker stopped sending heartbeats"""
+    cutoff = timezone.now() - STALE_AFTER
+    return ImportJob.objects.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+        status=ImportJob.STATUS_RUNNING
+    )
+
+
+def resume_job(token):
+    """
+    Requeue the failed (or orphaned running) job a resume token was issued
+    for and return it. Raises ValueError if the token is invalid or the job
+    cannot be resumed.
+    """
+    try:
+        job_id = signing.loads(token, salt=RESUME_SALT)['job']
+    except (signing.BadSignature, KeyError, TypeError):
+        raise ValueError('Invalid resume token')
+    resumable = ImportJob.objects.filter(pk=job_id, status=ImportJob.STATUS_FAILED) | stale_jobs().filter(pk=job_id)
+    resumed = resumable.update(
+        status=ImportJob.STATUS_PENDING,
+        attempts=0,
+        finished_at=None
+    )
+    if not resumed:
+        raise ValueError('Only failed imports can be resumed')
+    return ImportJob.objects.get(pk=job_id)
+
+
+def recover_stale_jobs():
+    """
+    Requeue the running jobs of workers that died mid-import (killed for
+    memory, redeployed); they resume from their checkpoint. Jobs already
+    tried MAX_ATTEMPTS times are failed instead, so one that keeps killing
+    its worker stops being retried. Returns the number of jobs recovered.
+    """
+    recovered = 0
+    for job in stale_jobs().only('id', 'attempts', 'errors', 'heartbeat_at'):
+        update = {'status': ImportJob.STATUS_PENDING}
+        if job.attempts >= MAX_ATTEMPTS:
+            update = {
+                'status': ImportJob.STATUS_FAILED,
+                'finished_at': timezone.now(),
+                'errors': job.errors + [f"Import worker stopped while running the import ({job.attempts} attempts)"],
+            }
+        # Skipped if the job's worker sent a heartbeat meanwhile
+        if ImportJob.objects.filter(
+            pk=job.pk, status=ImportJob.STATUS_RUNNING, heartbeat_at=job.heartbeat_at
+        ).update(**update):
+            logger.warning('Import job %s was orphaned by a stopped worker and is now %s', job.pk, update['status'])
+            recovered += 1
+    return recovered
+
+
+def claim_next_job():
+    """
+    Claim the oldest pending ImportJob, or return None if the queue is empty.
+    The conditional UPDATE makes the claim safe with several workers polling.
+    """
+    pending = ImportJob.objects.filter(status=ImportJob.STATUS_PENDING).order_by('created_at', 'id')
+    for job in pending.only('id')[:5]:
+        now = timezone.now()
+        claimed = ImportJob.objects.filter(pk=job.pk, status=ImportJob.STATUS_PENDING).update(
+            status=ImportJob.STATUS_RUNNING,
+            started_at=now,
+            heartbeat_at=now,
+            attempts=F('attempts') + 1
+        )
+        if claimed:
+            return ImportJob.objects.get(pk=job.pk)
+    return None
+
+
+def run_import_job(job):
+    """Run a claimed ImportJob, saving progress after every batch"""
+    def save_progress(engine):
+        job.rows_processed = engine.rows_processed
+        job.schools_created = engine.results['schools_created']
+        job.classes_created = engine.results['classes_created']
+        job.students_created = engine.results['students_created']
+        job.schools_updated = engine.results.get('schools_updated', 0)
+        job.classes_updated = engine.results.get('classes_updated', 0)
+        job.students_updated = engine.results.get('students_updated', 0)
+        job.rows_unchanged = engine.results.get('unchanged', 0)
+        job.errors = engine.results['errors']
+        job.checkpoint = engine.checkpoint
+        job.heartbeat_at = timezone.now()
+        job.save(update_fields=PROGRESS_FIELDS)
+
+    engine = ImportEngine(progress=save_progress, mode=job.mode, checkpoint=job.checkpoint)
+    if job.checkpoint:
+        # Resuming: carry on counting from what the failed run committed
+        engine.rows_processed = job.rows_processed
+        engine.results.update({
+            'schools_created': job.schools_created,
+            'classes_created': job.classes_created,
+            'students_created': job.students_created,
+            'errors': list(job.errors),
+        })
+        if engine.upsert:
+            engine.results.update({
+                'schools_updated': job.schools_updated,
+                'classes_updated': job.classes_updated,
+                'students_updated': job.students_updated,
+                'unchanged': job.rows_unchanged,
+            })
+    try:
+        with job.file.open('rb') as f:
+            import_workbook(f, engine, cache_key=job.cache_key, name=job.original_name or job.file.name,
+                            entity=job.entity or None)
+        job.status = ImportJob.STATUS_COMPLETED
+    except Exception as e:
+        engine.results['errors'].append(f"Error processing file: {str(e)}")
+        job.status = ImportJob.STATUS_FAILED
+        # Chunks committed before the failure still changed the class counts
+        rebuild_class_stats()
+
+    save_progress(engine)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'finished_at'])
+    return engine.results
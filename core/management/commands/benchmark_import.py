@@ -0,0 +1,110 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_databases, teardown_databases
+from core.importer import ImportEngine, MODES, MODE_CREATE, import_workbook, writer_threads
+from core.metrics import QueryRecorder
+from generate_template import create_synthetic_workbook
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+class CountingEngine(ImportEngine):
+    """ImportEngine that installs a QueryRecorder on each writer thread's connection"""
+
+    def __init__(self, counter, **kwargs):
+        super().__init__(**kwargs)
+        self.counter = counter
+
+    def _counted(self, write, rows, partition):
+        with connection.execute_wrapper(self.counter):
+            return write(rows, partition)
+
+    def import_schools(self, rows, partition=0):
+        return self._counted(super().import_schools, rows, partition)
+
+    def import_classes(self, rows, partition=0):
+        return self._counted(super().import_classes, rows, partition)
+
+    def import_students(self, rows, partition=0):
+        return self._counted(super().import_students, rows, partition)
+
+
+class Command(BaseCommand):
+    help = ('Time a full Excel import and report rows/sec, query count and peak RSS. '
+            'Runs against a throwaway test database built from the configured DATABASES.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', help='Workbook to import instead of generating synthetic data')
+        parser.add_argument('--schools', type=int, default=10)
+        parser.add_argument('--classes', type=int, default=10, help='Classes per school')
+        parser.add_argument('--students', type=int, default=25, help='Students per class')
+        parser.add_argument('--runs', type=int, default=1,
+                            help='Import the same file this many times; later runs measure re-imports')
+        parser.add_argument('--mode', choices=MODES, default=MODE_CREATE)
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--writers', type=int, default=None,
+                            help='Writer threads (defaults to IMPORT_WRITER_THREADS, 1 on SQLite)')
+        parser.add_argument('--keepdb', action='store_true', help='Keep the test database afterwards')
+
+    def handle(self, *args, **options):
+        workdir = tempfile.mkdtemp(prefix='import-benchmark-')
+        path = options['file']
+        if path is None:
+            path = os.path.join(workdir, 'benchmark.xlsx')
+            create_synthetic_workbook(path, options['schools'], options['classes'], options['students'])
+        elif not os.path.exists(path):
+            raise CommandError(f"File not found: {path}")
+
+        # The default in-memory SQLite test database would hide disk writes
+        test_settings = settings.DATABASES['default'].setdefault('TEST', {})
+        if connection.vendor == 'sqlite' and not test_settings.get('NAME'):
+            test_settings['NAME'] = os.path.join(workdir, 'benchmark.sqlite3')
+
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'],
+                                     aliases={'default'})
+        try:
+            writers = options['writers'] or writer_threads()
+            self.stdout.write(f"Database: {connection.vendor} ({connection.settings_dict['NAME']}), "
+                              f"writers: {writers}, mode: {options['mode']}")
+            for run in range(1, options['runs'] + 1):
+                self.run_once(run, path, writers, options)
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=options['keepdb'])
+            if not options['keepdb']:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    def run_once(self, run, path, writers, options):
+        counter = QueryRecorder()
+        engine_options = {'mode': options['mode']}
+        if options['batch_size']:
+            engine_options['batch_size'] = options['batch_size']
+        engine = CountingEngine(counter, **engine_options)
+
+        rss_before = peak_rss_mb()
+        start = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            results = import_workbook(path, engine=engine, writers=writers)
+        elapsed = time.perf_counter() - start
+
+        rows = engine.rows_processed
+        self.stdout.write(self.style.SUCCESS(
+            f"Run {run}: {rows} rows in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:.0f} rows/sec), "
+            f"{counter.count} queries ({counter.seconds:.2f}s in the database), "
+            f"peak RSS {peak_rss_mb():.1f} MB (was {rss_before:.1f} MB)"
+        ))
+        self.stdout.write(
+            f"  {results['schools_created']} schools, {results['classes_created']} classes, "
+            f"{results['students_created']} students created, {len(results['errors'])} errors"
+        )
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from core.importer import claim_next_job, recover_stale_jobs, run_import_job
+import time
+
+class Command(BaseCommand):
+    help = 'Process queued Excel imports, polling the ImportJob table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the queue and exit instead of polling forever')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Import worker started'))
+        while True:
+            # Drop connections that went stale while we were sleeping
+            close_old_connections()
+            # Requeue jobs left running by a worker that was killed mid-import
+            recovered = recover_stale_jobs()
+            if recovered:
+                self.stdout.write(f"Recovered {recovered} import job(s) from a stopped worker")
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+                continue
+
+            self.stdout.write(f"Running import job {job.pk} ({job.original_name})")
+            results = run_import_job(job)
+            self.stdout.write(self.style.SUCCESS(
+                f"Import job {job.pk} {job.status}: "
+                f"{results['schools_created']} schools, {results['classes_created']} classes, "
+                f"{results['students_created']} students, {len(results['errors'])} errors"
+            ))
@@ -0,0 +1,223 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class QueryRecorder:
+    """
+    Execute wrapper counting the queries of one request (or import) and
+    how often each statement ran. Safe to share between threads, e.g. the
+    import writers of core.pipeline.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.seconds += elapsed
+                self.count += 1
+                # SQL arrives with placeholders, so an N+1 loop repeats one statement
+                self.statements[sql] += 1
+
+
+# QueryRecorder of the request being handled. Context variables follow a
+# request into the threads async views use for the ORM, unlike a wrapper
+# installed on one thread's connection.
+current_recorder = ContextVar('current_recorder', default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    recorder = current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    # Fired again whenever a closed connection reconnects
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+class ViewStats:
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.seconds = 0.0
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.response_bytes = 0
+        self.over_budget = 0
+        self.statuses = Counter()
+
+
+class MetricsRegistry:
+    """
+    In-process request metrics keyed by (view, method).
+    Each gunicorn worker keeps its own registry and a scrape is answered by
+    whichever worker takes it, so every series carries that worker's pid.
+    Sum over the pid label, e.g. ``sum without (pid) (...)``, for totals.
+    """
+
+    def __init__(self):
+        self._views = defaultdict(ViewStats)
+        self._lock = threading.Lock()
+
+    def record(self, view, method, status, seconds, queries, query_seconds, size, over_budget):
+        with self._lock:
+            stats = self._views[(view, method)]
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    stats.buckets[i] += 1
+            stats.count += 1
+            stats.seconds += seconds
+            stats.queries += queries
+            stats.query_seconds += query_seconds
+            stats.response_bytes += size
+            stats.over_budget += over_budget
+            stats.statuses[status] += 1
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format"""
+        pid = os.getpid()
+
+        def labels(**values):
+            return _labels(**values, pid=pid)
+
+        with self._lock:
+            views = sorted(self._views.items())
+            lines = [
+                '# HELP api_request_duration_seconds Request latency by view',
+                '# TYPE api_request_duration_seconds histogram',
+            ]
+            for (view, method), stats in views:
+                view_labels = labels(view=view, method=method)
+                for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                    lines.append(f'api_request_duration_seconds_bucket{{{view_labels},le="{bound}"}} {count}')
+                lines.append(f'api_request_duration_seconds_bucket{{{view_labels},le="+Inf"}} {stats.count}')
+                lines.append(f'api_request_duration_seconds_sum{{{view_labels}}} {stats.seconds:.6f}')
+                lines.append(f'api_request_duration_seconds_count{{{view_labels}}} {stats.count}')
+
+            lines += [
+                '# HELP api_requests_total Requests by view and response status',
+                '# TYPE api_requests_total counter',
+            ]
+            for (view, method), stats in views:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(f'api_requests_total{{{labels(view=view, method=method, status=status)}}} {count}')
+
+            counters = [
+                ('api_db_queries_total', 'Database queries run by view', 'queries', '{}'),
+                ('api_db_query_seconds_total', 'Time spent in database queries by view', 'query_seconds', '{:.6f}'),
+                ('api_response_bytes_total', 'Response body bytes by view', 'response_bytes', '{}'),
+                ('api_query_budget_exceeded_total', 'Requests that ran more queries than API_QUERY_BUDGET',
+                 'over_budget', '{}'),
+            ]
+            for name, help_text, attr, fmt in counters:
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+                for (view, method), stats in views:
+                    value = fmt.format(getattr(stats, attr))
+                    lines.append(f'{name}{{{labels(view=view, method=method)}}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{key}="{escape(value)}"' for key, value in labels.items())
+
+
+registry = MetricsRegistry()
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match.route
+
+
+def _response_size(response):
+    if response.streaming:
+        # Streamed exports are never buffered, so only a declared length is known
+        return int(response.get('Content-Length', 0))
+    return len(response.content)
+
+
+class MetricsMiddleware:
+    """
+    Record latency, database queries and response size of every request.
+
+    Requests running more than settings.API_QUERY_BUDGET queries are logged
+    with their most repeated statement, which is usually an N+1 loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        token = current_recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        self.record(request, response, recorder, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        token = current_recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        self.record(request, response, recorder, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, recorder, elapsed):
+        view = _view_name(request)
+        budget = settings.API_QUERY_BUDGET
+        over_budget = recorder.count > budget
+        if over_budget:
+            statement, repeats = recorder.statements.most_common(1)[0]
+            logger.warning(
+                'Possible N+1 in %s %s (%s): %d queries over a budget of %d; '
+                'most repeated statement ran %d times: %s',
+                request.method, request.path, view, recorder.count, budget, repeats, statement
+            )
+
+        registry.record(
+            view, request.method, response.status_code, elapsed,
+            recorder.count, recorder.seconds, _response_size(response), over_budget
+        )
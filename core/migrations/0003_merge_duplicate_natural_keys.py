@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:05
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicates(apps, schema_editor):
+    """
+    Collapse schools and classes that would violate the new constraints
+    into the oldest row, repointing foreign keys first so no classes or
+    students are lost. Students are never merged: later students sharing
+    a student_id within a school get the id suffixed with their pk, and
+    are listed so the ids can be corrected by hand.
+    """
+    School = apps.get_model('core', 'School')
+    SchoolClass = apps.get_model('core', 'SchoolClass')
+    Student = apps.get_model('core', 'Student')
+
+    dupes = School.objects.values('name').annotate(keep=Min('id'), n=Count('id')).filter(n__gt=1)
+    for dupe in dupes:
+        others = School.objects.filter(name=dupe['name']).exclude(id=dupe['keep'])
+        SchoolClass.objects.filter(school__in=others).update(school_id=dupe['keep'])
+        Student.objects.filter(school__in=others).update(school_id=dupe['keep'])
+        others.delete()
+
+    dupes = SchoolClass.objects.values('school', 'name', 'academic_year').annotate(keep=Min('id'), n=Count('id')).filter(n__gt=1)
+    for dupe in dupes:
+        others = SchoolClass.objects.filter(
+            school=dupe['school'], name=dupe['name'], academic_year=dupe['academic_year']
+        ).exclude(id=dupe['keep'])
+        Student.objects.filter(school_class__in=others).update(school_class_id=dupe['keep'])
+        others.delete()
+
+    max_length = Student._meta.get_field('student_id').max_length
+    dupes = Student.objects.filter(student_id__gt='').values('school', 'student_id').annotate(keep=Min('id'), n=Count('id')).filter(n__gt=1)
+    renamed = []
+    for dupe in dupes:
+        others = Student.objects.filter(school=dupe['school'], student_id=dupe['student_id']).exclude(id=dupe['keep'])
+        for student in others:
+            suffix = f"-{student.pk}"
+            student.student_id = student.student_id[:max_length - len(suffix)] + suffix
+            student.save(update_fields=['student_id'])
+            renamed.append(f"  student {student.pk}: {dupe['student_id']!r} -> {student.student_id!r}")
+    if renamed:
+        print(f"\n  Renamed {len(renamed)} duplicate student_id(s):")
+        print('\n'.join(renamed))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_importjob'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_merge_duplicate_natural_keys'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='school',
+            name='name',
+            field=models.CharField(max_length=200, unique=True),
+        ),
+        migrations.AddConstraint(
+            model_name='schoolclass',
+            constraint=models.UniqueConstraint(fields=('school', 'name', 'academic_year'), name='unique_class_per_school_year'),
+        ),
+        migrations.AddConstraint(
+            model_name='student',
+            constraint=models.UniqueConstraint(condition=models.Q(('student_id__gt', '')), fields=('school', 'student_id'), name='unique_student_id_per_school'),
+        ),
+    ]
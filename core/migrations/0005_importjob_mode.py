@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_natural_key_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='classes_updated',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='mode',
+            field=models.CharField(choices=[('create', 'Create new records only'), ('upsert', 'Create new and update changed records')], default='create', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='rows_unchanged',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='schools_updated',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='students_updated',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
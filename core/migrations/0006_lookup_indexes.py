@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_importjob_mode'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='schoolclass',
+            index=models.Index(fields=['name'], name='class_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schoolclass',
+            index=models.Index(fields=['grade_level'], name='class_grade_level_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schoolclass',
+            index=models.Index(fields=['academic_year'], name='class_academic_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['student_id'], name='student_student_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['last_name', 'first_name'], name='student_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['school', 'last_name', 'first_name'], name='student_school_name_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+# ?search= runs UPPER(column) LIKE UPPER('%term%'), which a plain btree
+# index cannot serve. On PostgreSQL these trigram GIN indexes on the same
+# expression can; other databases skip them.
+TRIGRAM_INDEXES = [
+    ('core_school_name_trgm', 'core_school', 'name'),
+    ('core_schoolclass_name_trgm', 'core_schoolclass', 'name'),
+    ('core_student_first_name_trgm', 'core_student', 'first_name'),
+    ('core_student_last_name_trgm', 'core_student', 'last_name'),
+    ('core_student_student_id_trgm', 'core_student', 'student_id'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_class_stats(apps, schema_editor):
+    """Count the students already in each class"""
+    Student = apps.get_model('core', 'Student')
+    ClassStats = apps.get_model('core', 'ClassStats')
+    counts = Student.objects.values('school_class_id').annotate(n=Count('id')).values_list('school_class_id', 'n')
+    ClassStats.objects.bulk_create(
+        [ClassStats(school_class_id=class_id, student_count=n) for class_id, n in counts],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_importjob_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassStats',
+            fields=[
+                ('school_class', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.schoolclass')),
+                ('student_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Class stats',
+            },
+        ),
+        migrations.RunPython(populate_class_stats, migrations.RunPython.noop),
+    ]
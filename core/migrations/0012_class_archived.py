@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_import_job_entity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schoolclass',
+            name='archived',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:39
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def log_existing_rows(apps, schema_editor):
+    """Record every existing row as an insert, so syncing from cursor 0 returns everything"""
+    Change = apps.get_model('core', 'Change')
+    for entity, model_name in [('schools', 'School'), ('classes', 'SchoolClass'), ('students', 'Student')]:
+        ids = apps.get_model('core', model_name).objects.order_by('id').values_list('id', flat=True)
+        Change.objects.bulk_create(
+            (Change(entity=entity, object_id=pk, action='insert') for pk in ids.iterator()),
+            batch_size=1000
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_class_archived'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='school',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='school',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='schoolclass',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='schoolclass',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('insert', 'Insert'), ('update', 'Update'), ('delete', 'Delete')], max_length=10)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['entity', 'id'], name='change_entity_idx')],
+            },
+        ),
+        migrations.RunPython(log_existing_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:51
+
+from django.db import migrations
+from django.db.models import Count, Min, Q
+
+
+def blank_academic_years(apps, schema_editor):
+    """
+    Store a missing academic year as '' instead of NULL. Classes that only
+    differed by NULL and '' become duplicates, so they are merged into the
+    oldest first, moving their students across.
+    """
+    SchoolClass = apps.get_model('core', 'SchoolClass')
+    Student = apps.get_model('core', 'Student')
+    ClassStats = apps.get_model('core', 'ClassStats')
+
+    blank = SchoolClass.objects.filter(Q(academic_year__isnull=True) | Q(academic_year=''))
+    dupes = blank.values('school', 'name').annotate(keep=Min('id'), n=Count('id')).filter(n__gt=1)
+    for dupe in dupes:
+        others = blank.filter(school=dupe['school'], name=dupe['name']).exclude(id=dupe['keep'])
+        Student.objects.filter(school_class__in=others).update(school_class_id=dupe['keep'])
+        others.delete()
+        ClassStats.objects.update_or_create(
+            school_class_id=dupe['keep'],
+            defaults={'student_count': Student.objects.filter(school_class_id=dupe['keep']).count()}
+        )
+
+    SchoolClass.objects.filter(academic_year__isnull=True).update(academic_year='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_change_feed'),
+    ]
+
+    operations = [
+        migrations.RunPython(blank_academic_years, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Separate from the data migration: PostgreSQL cannot alter a table
+    # with deferred foreign key checks pending in the same transaction
+    dependencies = [
+        ('core', '0014_blank_class_academic_years'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='schoolclass',
+            name='academic_year',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+    ]
@@ -1,10 +1,13 @@
+from django.conf import settings
 from django.db import models
 
 class School(models.Model):
-    name = models.CharField(max_length=200)
+    name = models.CharField(max_length=200, unique=True)
     address = models.TextField(blank=True, null=True)
     phone = models.CharField(max_length=50, blank=True, null=True)
     email = models.EmailField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.name
@@ -13,13 +16,26 @@ class SchoolClass(models.Model):
     name = models.CharField(max_length=100)
     school = models.ForeignKey(School, on_delete=models.CASCADE, related_name='classes')
     grade_level = models.CharField(max_length=50, blank=True, null=True)
-    academic_year = models.CharField(max_length=20, blank=True, null=True)
+    # '' when not given; NULLs would never collide in unique_class_per_school_year
+    academic_year = models.CharField(max_length=20, blank=True, default='')
+    # Set on the classes of a finished year once their students were promoted
+    archived = models.BooleanField(default=False, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.school.name} - {self.name}"
     
     class Meta:
         verbose_name_plural = "School Classes"
+        constraints = [
+            models.UniqueConstraint(fields=['school', 'name', 'academic_year'], name='unique_class_per_school_year'),
+        ]
+        indexes = [
+            models.Index(fields=['name'], name='class_name_idx'),
+            models.Index(fields=['grade_level'], name='class_grade_level_idx'),
+            models.Index(fields=['academic_year'], name='class_academic_year_idx'),
+        ]
 
 class Student(models.Model):
     first_name = models.CharField(max_length=100)
@@ -32,6 +48,128 @@ class Student(models.Model):
     address = models.TextField(blank=True, null=True)
     parent_name = models.CharField(max_length=200, blank=True, null=True)
     parent_contact = models.CharField(max_length=100, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
-        return f"{self.first_name} {self.last_name}"
\ No newline at end of file
+        return f"{self.first_name} {self.last_name}"
+
+    class Meta:
+        constraints = [
+            # Students without an id are allowed, so blank ids are excluded
+            models.UniqueConstraint(
+                fields=['school', 'student_id'],
+                condition=models.Q(student_id__gt=''),
+                name='unique_student_id_per_school'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['student_id'], name='student_student_id_idx'),
+            models.Index(fields=['last_name', 'first_name'], name='student_name_idx'),
+            models.Index(fields=['school', 'last_name', 'first_name'], name='student_school_name_idx'),
+        ]
+
+class ClassStats(models.Model):
+    """
+    Number of students in each class, kept current by core.signals and
+    rebuilt by core.stats after bulk writes. Classes without a row have no
+    students yet.
+    """
+    school_class = models.OneToOneField(SchoolClass, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    student_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.school_class_id}: {self.student_count} students"
+
+    class Meta:
+        verbose_name_plural = "Class stats"
+
+class Change(models.Model):
+    """
+    Append-only log of inserts, updates and deletes of schools, classes
+    and students, read by /api/changes/. The id is the sync cursor.
+    Written by core.signals for single saves and deletes and by core.changes
+    for bulk writes, which skip the signals.
+    """
+    ACTION_INSERT = 'insert'
+    ACTION_UPDATE = 'update'
+    ACTION_DELETE = 'delete'
+    ACTION_CHOICES = [
+        (ACTION_INSERT, 'Insert'),
+        (ACTION_UPDATE, 'Update'),
+        (ACTION_DELETE, 'Delete'),
+    ]
+
+    # schools, classes or students, as in the export and import ?entity=
+    entity = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.pk}: {self.action} {self.entity} {self.object_id}"
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['entity', 'id'], name='change_entity_idx'),
+        ]
+
+class ImportJob(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    MODE_CHOICES = [
+        ('create', 'Create new records only'),
+        ('upsert', 'Create new and update changed records'),
+    ]
+
+    file = models.FileField(upload_to='imports/')
+    original_name = models.CharField(max_length=255, blank=True)
+    # SHA-256 of the uploaded file: finds earlier imports of the same file and its cached sheets
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    # Entity held by a CSV, TSV or NDJSON upload; blank for workbooks, zips and files named after theirs
+    entity = models.CharField(max_length=20, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, default='create')
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, blank=True, null=True, related_name='import_jobs')
+    rows_processed = models.PositiveIntegerField(default=0)
+    schools_created = models.PositiveIntegerField(default=0)
+    classes_created = models.PositiveIntegerField(default=0)
+    students_created = models.PositiveIntegerField(default=0)
+    schools_updated = models.PositiveIntegerField(default=0)
+    classes_updated = models.PositiveIntegerField(default=0)
+    students_updated = models.PositiveIntegerField(default=0)
+    rows_unchanged = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    # Sheet and rows committed per writer partition, for resuming a failed import
+    checkpoint = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    # Refreshed by the worker after every batch; a running job whose
+    # heartbeat stops was orphaned by a worker that died
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+    # Times a worker claimed the job, counting runs recovered after a crash
+    attempts = models.PositiveSmallIntegerField(default=0)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Import {self.pk} ({self.status})"
+
+    @property
+    def cache_key(self):
+        """Key of the file's parsed sheets in the workbook cache"""
+        if not self.content_hash:
+            return None
+        return f"{self.content_hash}-{self.entity}" if self.entity else self.content_hash
+
+    class Meta:
+        ordering = ['-created_at']
@@ -0,0 +1,35 @@
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Keyset pagination over the primary key. Each page is an indexed
+    ``WHERE id > last_seen ORDER BY id LIMIT n`` query with no COUNT(*),
+    so walking the whole table costs the same per page however deep it goes.
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class PaginationModeMixin:
+    """
+    Lets clients opt in to keyset pagination with ``?pagination=cursor``.
+    Requests without it keep the default page-number pagination.
+    """
+    cursor_pagination_class = KeysetPagination
+
+    def use_cursor_pagination(self):
+        params = self.request.query_params
+        return params.get('pagination') == 'cursor' or 'cursor' in params
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.request is not None and self.use_cursor_pagination():
+                self._paginator = self.cursor_pagination_class()
+            elif self.pagination_class is None:
+                self._paginator = None
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
@@ -0,0 +1,82 @@
+import queue
+import threading
+import zlib
+from django.db import connection
+
+# Batches buffered per writer before the parser blocks
+QUEUE_DEPTH = 4
+
+
+def partition_for(value, writers):
+    """Stable partition number for a partition key such as a school name"""
+    return zlib.crc32(str(value).encode()) % writers
+
+
+def run_pipeline(rows, write, partition_key=None, writers=1, batch_size=1000, depth=QUEUE_DEPTH, skip=None):
+    """
+    Parse rows on the calling thread and write them from writer threads.
+
+    Rows are grouped into batches per partition (``row[partition_key]``,
+    e.g. the school name) and handed to that partition's writer over a
+    bounded queue, so parsing overlaps with database writes and two writers
+    never insert rows for the same school. Returns once every batch has
+    been written; the first writer error is re-raised here.
+
+    ``write(batch, partition)`` is called with the writer's partition
+    number. ``skip`` lists how many leading rows of each partition to drop,
+    e.g. the rows a failed run had already committed.
+    """
+    queues = [queue.Queue(maxsize=depth) for _ in range(writers)]
+    failures = []
+
+    def consume(partition, batches):
+        try:
+            while True:
+                batch = batches.get()
+                if batch is None:
+                    return
+                # After a failure keep draining so the parser never blocks
+                if failures:
+                    continue
+                try:
+                    write(batch, partition)
+                except Exception as e:
+                    failures.append(e)
+        finally:
+            # Each writer thread opened its own database connection
+            connection.close()
+
+    threads = [
+        threading.Thread(target=consume, args=(n, batches), name=f'import-writer-{n}', daemon=True)
+        for n, batches in enumerate(queues)
+    ]
+    for thread in threads:
+        thread.start()
+
+    buffers = [[] for _ in queues]
+    skipped = [0] * writers
+    try:
+        for row in rows:
+            if failures:
+                break
+            n = 0
+            if partition_key is not None and writers > 1:
+                n = partition_for(row.get(partition_key), writers)
+            if skip and skipped[n] < skip[n]:
+                skipped[n] += 1
+                continue
+            buffers[n].append(row)
+            if len(buffers[n]) >= batch_size:
+                queues[n].put(buffers[n])
+                buffers[n] = []
+        for n, buffer in enumerate(buffers):
+            if buffer and not failures:
+                queues[n].put(buffer)
+    finally:
+        for batches in queues:
+            batches.put(None)
+        for thread in threads:
+            thread.join()
+
+    if failures:
+        raise failures[0]
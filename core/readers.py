@@ -0,0 +1,204 @@
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import zipfile
+import openpyxl
+
+# Sheets understood by the importer, in the order they must be processed
+SHEETS = ['Schools', 'Classes', 'Students']
+
+# Entity names of per-entity files (students.csv) and of the export endpoint's ?entity=
+ENTITIES = {
+    'schools': 'Schools',
+    'classes': 'Classes',
+    'students': 'Students',
+}
+
+# Formats holding the rows of one entity per file; each may be gzipped (.csv.gz)
+TEXT_FORMATS = ['csv', 'tsv', 'ndjson']
+
+# Every accepted upload format, by file extension
+FORMATS = ['xlsx', 'zip'] + TEXT_FORMATS
+
+EXTENSION_ALIASES = {
+    'jsonl': 'ndjson',
+}
+
+
+def file_format(name):
+    """
+    Return (format, gzipped) for a file name such as students.csv.gz, or
+    None if the format cannot be imported.
+    """
+    name = os.path.basename(name).lower()
+    gzipped = name.endswith('.gz')
+    if gzipped:
+        name = name[:-3]
+    extension = os.path.splitext(name)[1].lstrip('.')
+    extension = EXTENSION_ALIASES.get(extension, extension)
+    if extension not in FORMATS or (gzipped and extension not in TEXT_FORMATS):
+        return None
+    return extension, gzipped
+
+
+def entity_sheet(name):
+    """The sheet a per-entity file named like students.csv or students-2024.ndjson holds, or None"""
+    match = re.match(r'[a-z]+', os.path.basename(name).lower())
+    return ENTITIES.get(match.group()) if match else None
+
+
+def open_workbook(file):
+    """
+    Open an .xlsx file in openpyxl's read-only mode. Rows are parsed lazily
+    as they are iterated, so memory use does not grow with the sheet size.
+    """
+    return openpyxl.load_workbook(file, read_only=True, data_only=True)
+
+
+def iter_sheet_rows(worksheet):
+    """
+    Yield each data row of a worksheet as a dict keyed by the header row.
+    Completely empty rows are skipped.
+    """
+    rows = worksheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = [str(value) if value is not None else '' for value in header]
+
+    for values in rows:
+        if all(value is None or value == '' for value in values):
+            continue
+        yield dict(zip(columns, values))
+
+
+def iter_delimited_rows(text, delimiter):
+    """Yield each data row of a CSV or TSV file as a dict keyed by the header row"""
+    reader = csv.reader(text, delimiter=delimiter)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = [column.strip() for column in header]
+
+    for values in reader:
+        if all(value == '' for value in values):
+            continue
+        yield dict(zip(columns, values))
+
+
+def iter_ndjson_rows(text):
+    """Yield each line of an NDJSON file, which must be a JSON object keyed by column"""
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        if not isinstance(row, dict):
+            raise ValueError(f"Line {number} is not a JSON object")
+        yield row
+
+
+def iter_text_rows(stream, fmt, gzipped=False):
+    """
+    Stream the rows of a binary CSV, TSV or NDJSON file. Only one buffer of
+    the (decompressed) text is held at a time.
+    """
+    if gzipped:
+        stream = gzip.GzipFile(fileobj=stream)
+    # utf-8-sig drops the byte order mark Excel writes at the start of CSV files
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        if fmt == 'ndjson':
+            yield from iter_ndjson_rows(text)
+        else:
+            yield from iter_delimited_rows(text, '\t' if fmt == 'tsv' else ',')
+    finally:
+        # Leave the underlying file open for its owner to close
+        text.detach()
+
+
+class XlsxSource:
+    """The sheets of an .xlsx workbook"""
+
+    def __init__(self, file):
+        self.workbook = open_workbook(file)
+        self.sheetnames = self.workbook.sheetnames
+
+    def rows(self, sheet):
+        return iter_sheet_rows(self.workbook[sheet])
+
+    def close(self):
+        # Read-only workbooks keep the underlying file open until closed
+        self.workbook.close()
+
+
+class EntitySource:
+    """A CSV, TSV or NDJSON file holding the rows of one sheet"""
+
+    def __init__(self, file, fmt, gzipped, sheet):
+        self.file = file
+        self.fmt = fmt
+        self.gzipped = gzipped
+        self.sheetnames = [sheet]
+
+    def rows(self, sheet):
+        if isinstance(self.file, str):
+            with open(self.file, 'rb') as f:
+                yield from iter_text_rows(f, self.fmt, self.gzipped)
+        else:
+            self.file.seek(0)
+            yield from iter_text_rows(self.file, self.fmt, self.gzipped)
+
+    def close(self):
+        pass
+
+
+class ZipSource:
+    """A zip of per-entity CSV, TSV or NDJSON files, e.g. schools.csv and students.csv"""
+
+    def __init__(self, file):
+        self.archive = zipfile.ZipFile(file)
+        self.members = {}
+        for info in self.archive.infolist():
+            detected = file_format(info.filename)
+            sheet = entity_sheet(info.filename)
+            if info.is_dir() or detected is None or detected[0] not in TEXT_FORMATS or sheet is None:
+                continue
+            if sheet in self.members:
+                raise ValueError(f"The zip holds more than one {sheet.lower()} file")
+            self.members[sheet] = (info, *detected)
+        self.sheetnames = [sheet for sheet in SHEETS if sheet in self.members]
+
+    def rows(self, sheet):
+        info, fmt, gzipped = self.members[sheet]
+        with self.archive.open(info) as member:
+            yield from iter_text_rows(member, fmt, gzipped)
+
+    def close(self):
+        self.archive.close()
+
+
+def open_source(file, name, entity=None):
+    """
+    Open an uploaded file for import. ``name`` (the original file name)
+    selects the format; a CSV, TSV or NDJSON file holds the sheet of
+    ``entity``, or of the entity it is named after. Every source has
+    ``sheetnames``, ``rows(sheet)`` yielding dicts keyed by column, and
+    ``close()``.
+    """
+    detected = file_format(name)
+    if detected is None:
+        raise ValueError(f"Unsupported file format: {os.path.basename(name)}")
+    fmt, gzipped = detected
+    if fmt == 'xlsx':
+        return XlsxSource(file)
+    if fmt == 'zip':
+        return ZipSource(file)
+
+    sheet = ENTITIES.get(entity) if entity else entity_sheet(name)
+    if sheet is None:
+        raise ValueError(f"Cannot tell which entity {os.path.basename(name)} holds; "
+                         f"name it after one ({', '.join(ENTITIES)}) or pass entity")
+    return EntitySource(file, fmt, gzipped, sheet)
@@ -1,17 +1,161 @@
+from django.db import models
 from rest_framework import serializers
-from .models import School, SchoolClass, Student
+from .models import School, SchoolClass, Student, ImportJob
+from .importer import resume_token
+
+class ExpandableSerializerMixin:
+    """
+    Swaps the fields named in context['expand'] for nested, read-only
+    serializers declared in Meta.expandable_fields. Only the top-level
+    serializer expands, so nested objects never trigger further queries.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return fields
+
+        for name in self.context.get('expand', ()):
+            serializer_class, kwargs = self.Meta.expandable_fields[name]
+            fields[name] = serializer_class(read_only=True, **kwargs)
+        return fields
+
+class ValuesSerializer:
+    """
+    Hand-written read serializer for rows from QuerySet.values(). The keys
+    already match the ModelSerializer field names, so rendering is a dict
+    projection plus ISO formatting of dates, without per-field DRF objects.
+    """
+
+    def __init__(self, model, fields):
+        self.fields = list(fields)
+        self.date_fields = []
+        self.datetime_fields = []
+        for name in self.fields:
+            field = model._meta.get_field(name)
+            if isinstance(field, models.DateTimeField):
+                self.datetime_fields.append(name)
+            elif isinstance(field, models.DateField):
+                self.date_fields.append(name)
+
+    def to_representation(self, rows):
+        data = []
+        for row in rows:
+            item = {name: row[name] for name in self.fields}
+            for name in self.date_fields:
+                if item[name] is not None:
+                    item[name] = item[name].isoformat()
+            for name in self.datetime_fields:
+                if item[name] is not None:
+                    # Same format as DRF's DateTimeField
+                    value = item[name].isoformat()
+                    item[name] = value[:-6] + 'Z' if value.endswith('+00:00') else value
+            data.append(item)
+        return data
 
 class SchoolSerializer(serializers.ModelSerializer):
     class Meta:
         model = School
         fields = '__all__'
 
-class SchoolClassSerializer(serializers.ModelSerializer):
+class AcademicYearMixin:
+    """Accept a null academic_year, stored as '' like a missing one"""
+
+    def validate_academic_year(self, value):
+        return value or ''
+
+class SchoolClassSerializer(AcademicYearMixin, serializers.ModelSerializer):
     class Meta:
         model = SchoolClass
         fields = '__all__'
+        extra_kwargs = {'academic_year': {'allow_null': True}}
 
 class StudentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Student
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+        extra_kwargs = {
+            # Class choices in the browsable API render SchoolClass.__str__
+            'school_class': {'queryset': SchoolClass.objects.select_related('school')},
+        }
+
+class ExpandableSchoolSerializer(ExpandableSerializerMixin, SchoolSerializer):
+    class Meta(SchoolSerializer.Meta):
+        expandable_fields = {
+            'classes': (SchoolClassSerializer, {'many': True}),
+        }
+
+class ExpandableSchoolClassSerializer(ExpandableSerializerMixin, SchoolClassSerializer):
+    class Meta(SchoolClassSerializer.Meta):
+        expandable_fields = {
+            'school': (SchoolSerializer, {}),
+        }
+
+class ExpandableStudentSerializer(ExpandableSerializerMixin, StudentSerializer):
+    class Meta(StudentSerializer.Meta):
+        expandable_fields = {
+            'school': (SchoolSerializer, {}),
+            'school_class': (SchoolClassSerializer, {}),
+        }
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    # Send back as resume_token to continue a failed import from its checkpoint
+    resume_token = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id', 'original_name', 'content_hash', 'entity', 'status', 'mode', 'rows_processed',
+            'schools_created', 'classes_created', 'students_created',
+            'schools_updated', 'classes_updated', 'students_updated', 'rows_unchanged', 'errors',
+            'checkpoint', 'resume_token', 'attempts', 'created_at', 'started_at', 'heartbeat_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+    def get_resume_token(self, job):
+        if job.status != ImportJob.STATUS_FAILED:
+            return None
+        return resume_token(job)
+
+# Request bodies of the bulk student and class endpoints (see core.bulk)
+
+class MoveStudentsSerializer(serializers.Serializer):
+    school_class = serializers.PrimaryKeyRelatedField(queryset=SchoolClass.objects.all())
+
+class PromoteGradeSerializer(serializers.Serializer):
+    school = serializers.PrimaryKeyRelatedField(queryset=School.objects.all(), required=False)
+    grade_level = serializers.CharField()
+    academic_year = serializers.CharField()
+    to_grade_level = serializers.CharField(required=False)
+    to_academic_year = serializers.CharField()
+    create = serializers.BooleanField(default=False)
+    archive = serializers.BooleanField(default=True)
+
+# Batch add-* endpoints validate field formats with these serializers.
+# References and uniqueness are checked once per batch rather than per
+# item, so the relation fields and unique validators are left out.
+
+class SchoolBatchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = School
+        fields = ['name', 'address', 'phone', 'email']
+        extra_kwargs = {'name': {'validators': []}}
+
+class SchoolClassBatchSerializer(AcademicYearMixin, serializers.ModelSerializer):
+    class Meta:
+        model = SchoolClass
+        fields = ['name', 'grade_level', 'academic_year']
+        extra_kwargs = {'academic_year': {'allow_null': True}}
+        validators = []
+
+class StudentBatchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Student
+        fields = [
+            'first_name', 'last_name', 'student_id', 'date_of_birth',
+            'email', 'address', 'parent_name', 'parent_contact'
+        ]
+        validators = []
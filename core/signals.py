@@ -0,0 +1,75 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .cache import bump_version
+from .changes import log_change
+from .models import Change, School, SchoolClass, Student
+from .stats import add_students
+
+# Set while core.bulk deletes rows with QuerySet.delete(). It logs, recounts
+# and invalidates once for the whole set, so the per-row receivers skip it.
+_muted = ContextVar('muted_signals', default=False)
+
+
+@contextmanager
+def muted_signals():
+    token = _muted.set(True)
+    try:
+        yield
+    finally:
+        _muted.reset(token)
+
+
+@receiver([post_save, post_delete], sender=School)
+@receiver([post_save, post_delete], sender=SchoolClass)
+@receiver([post_save, post_delete], sender=Student)
+def invalidate_cached_responses(sender, using, **kwargs):
+    if _muted.get():
+        return
+    # After commit, or a request racing the transaction could cache the old rows again
+    transaction.on_commit(lambda: bump_version(sender), using=using)
+
+
+@receiver(post_save, sender=School)
+@receiver(post_save, sender=SchoolClass)
+@receiver(post_save, sender=Student)
+def log_saved(sender, instance, created, **kwargs):
+    log_change(sender, instance.pk, Change.ACTION_INSERT if created else Change.ACTION_UPDATE)
+
+
+@receiver(post_delete, sender=School)
+@receiver(post_delete, sender=SchoolClass)
+@receiver(post_delete, sender=Student)
+def log_deleted(sender, instance, **kwargs):
+    if _muted.get():
+        return
+    log_change(sender, instance.pk, Change.ACTION_DELETE)
+
+
+@receiver(pre_save, sender=Student)
+def remember_student_class(sender, instance, **kwargs):
+    # The class a student is saved from, so a move updates both counts
+    instance._stats_class_id = None
+    if not instance._state.adding:
+        instance._stats_class_id = (
+            Student.objects.filter(pk=instance.pk).values_list('school_class_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Student)
+def count_saved_student(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_stats_class_id', None)
+    if created:
+        add_students(instance.school_class_id, 1)
+    elif previous is not None and previous != instance.school_class_id:
+        add_students(previous, -1)
+        add_students(instance.school_class_id, 1)
+
+
+@receiver(post_delete, sender=Student)
+def count_deleted_student(sender, instance, **kwargs):
+    if _muted.get():
+        return
+    add_students(instance.school_class_id, -1)
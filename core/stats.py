@@ -0,0 +1,68 @@
+from django.db import transaction
+from django.db.models import Count, F
+from .models import ClassStats, SchoolClass, Student
+
+
+def rebuild_class_stats(school_ids=None):
+    """
+    Recount the students of every class (or only the classes of
+    ``school_ids``) in one aggregate query. Used after bulk writes, which
+    skip the signals that keep the counts current.
+    """
+    students = Student.objects.all()
+    stats = ClassStats.objects.all()
+    if school_ids is not None:
+        students = students.filter(school_class__school_id__in=school_ids)
+        stats = stats.filter(school_class__school_id__in=school_ids)
+    counts = students.values('school_class_id').annotate(n=Count('id')).values_list('school_class_id', 'n')
+
+    with transaction.atomic():
+        stats.delete()
+        ClassStats.objects.bulk_create(
+            [ClassStats(school_class_id=class_id, student_count=n) for class_id, n in counts],
+            batch_size=1000
+        )
+
+
+def add_students(class_id, n):
+    """Adjust the stored student count of a class by ``n``"""
+    updated = ClassStats.objects.filter(pk=class_id).update(student_count=F('student_count') + n)
+    if not updated and n > 0:
+        # First student of the class: count from scratch, in case any were bulk inserted
+        ClassStats.objects.update_or_create(
+            school_class_id=class_id,
+            defaults={'student_count': Student.objects.filter(school_class_id=class_id).count()}
+        )
+
+
+def school_stats(school_id):
+    """
+    Roster statistics of one school from the summary table: students per
+    class, students and classes per grade level and per academic year.
+    """
+    classes = list(
+        SchoolClass.objects.filter(school_id=school_id)
+        .order_by('academic_year', 'grade_level', 'name', 'id')
+        .values('id', 'name', 'grade_level', 'academic_year', student_count=F('stats__student_count'))
+    )
+
+    grade_levels = {}
+    academic_years = {}
+    for school_class in classes:
+        school_class['student_count'] = school_class['student_count'] or 0
+        for groups, key in ((grade_levels, 'grade_level'), (academic_years, 'academic_year')):
+            group = groups.setdefault(school_class[key], {key: school_class[key], 'class_count': 0, 'student_count': 0})
+            group['class_count'] += 1
+            group['student_count'] += school_class['student_count']
+
+    def ordered(groups, key):
+        return sorted(groups.values(), key=lambda group: (group[key] is None, group[key] or ''))
+
+    return {
+        'school': school_id,
+        'class_count': len(classes),
+        'student_count': sum(school_class['student_count'] for school_class in classes),
+        'classes': classes,
+        'grade_levels': ordered(grade_levels, 'grade_level'),
+        'academic_years': ordered(academic_years, 'academic_year'),
+    }
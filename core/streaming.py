@@ -0,0 +1,35 @@
+from itertools import islice
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+# Items taken from a sync iterator per hop to the sync thread
+CHUNK_SIZE = 1000
+
+
+async def aiter_chunks(iterable, size=CHUNK_SIZE):
+    """
+    Async iterator over a sync one. Items are taken ``size`` at a time
+    through sync_to_async, so ORM queries and file reads run on the sync
+    thread and only one chunk is held in memory.
+    """
+    iterator = iter(iterable)
+    take = sync_to_async(lambda: list(islice(iterator, size)))
+    while True:
+        chunk = await take()
+        if not chunk:
+            return
+        for item in chunk:
+            yield item
+
+
+def stream(request, response, size=CHUNK_SIZE):
+    """
+    Serve a streaming response incrementally under ASGI as well. Django's
+    ASGI handler reads sync streaming content into one list with
+    sync_to_async(list) before sending a byte, so there it is swapped for
+    aiter_chunks(); under WSGI the sync iterator already streams. The
+    response still closes the original iterator when it is done.
+    """
+    if isinstance(getattr(request, '_request', request), ASGIRequest) and not response.is_async:
+        response.streaming_content = aiter_chunks(response.streaming_content, size)
+    return response
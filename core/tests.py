@@ -1,3 +1,763 @@
-from django.test import TestCase
+import functools
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from unittest import mock
+import openpyxl
+import pandas as pd
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.migrations.loader import MigrationLoader
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient, force_authenticate
+from . import importer, workbook_cache
+from .bulk import delete_students
+from .changes import stream_changes
+from .exporter import build_xlsx
+from .importer import (
+    MAX_ATTEMPTS, MODE_UPSERT, ImportEngine, clean_value, import_workbook, recover_stale_jobs, resume_job,
+    resume_token, run_import_job
+)
+from .metrics import MetricsRegistry
+from .models import Change, ImportJob, School, SchoolClass, Student
+from .serializers import StudentSerializer
+from .stats import rebuild_class_stats, school_stats
+from .validation import _text
+from .views import changes, export_data
 
-# Create your tests here.
+SCHOOLS = [
+    ['name', 'address', 'phone', 'email'],
+    ['East', '1 Main Street', '555-0100', 'east@example.com'],
+    ['West', '', '', ''],
+]
+CLASSES = [
+    ['school_name', 'name', 'grade_level', 'academic_year'],
+    ['East', '9A', '9', '2024-2025'],
+    ['West', '10A', '10', '2024-2025'],
+    ['Nowhere', '1A', '1', '2024-2025'],
+]
+STUDENTS = [
+    ['first_name', 'last_name', 'student_id', 'date_of_birth', 'school_name', 'class_name',
+     'email', 'address', 'parent_name', 'parent_contact'],
+    ['Ada', 'Lovelace', 'S1', '2009-12-10', 'East', '9A', 'ada@example.com', '2 Hill Road', 'Anne', '555-0101'],
+    ['Alan', 'Turing', 'S2', '2010-06-23', 'East', '9A', 'alan@example.com', '3 Park Lane', 'Ethel', '555-0102'],
+    ['Grace', 'Hopper', '', '2008-12-09', 'West', '10A', '', '', '', ''],
+    ['Bad', 'Class', 'S4', '', 'East', '9Z', '', '', '', ''],
+    ['No', 'School', 'S5', '', 'Nowhere', '1A', '', '', '', ''],
+]
+
+ERRORS = [
+    "School 'Nowhere' does not exist for class '1A'",
+    "Class '9Z' does not exist in school 'East' for student 'Bad Class'",
+    "School 'Nowhere' does not exist for student 'No School'",
+]
+
+
+# Cached API responses go to memory instead of .cache/api
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'api': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'},
+}
+
+
+def xlsx(schools=SCHOOLS, classes=CLASSES, students=STUDENTS):
+    """An uploaded workbook holding the given sheets"""
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    for title, rows in (('Schools', schools), ('Classes', classes), ('Students', students)):
+        sheet = workbook.create_sheet(title)
+        for row in rows:
+            sheet.append(row)
+    file = io.BytesIO()
+    workbook.save(file)
+    file.seek(0)
+    file.name = 'import.xlsx'
+    return file
+
+
+def csv(rows, name):
+    file = io.BytesIO('\n'.join(','.join(row) for row in rows).encode())
+    file.name = name
+    return file
+
+
+async def collect(response):
+    """The body of a response streamed through an async iterator"""
+    return b''.join([part async for part in response])
+
+
+# Imports write from pipeline threads with their own connections, so these
+# tests commit for real instead of running inside one transaction
+class ImportTests(TransactionTestCase):
+
+    def setUp(self):
+        # Queued uploads and the workbook cache go to a scratch directory
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=os.path.join(tmp, 'media'))
+        media.enable()
+        self.addCleanup(media.disable)
+        patcher = mock.patch.object(workbook_cache, 'CACHE_DIR', os.path.join(tmp, 'workbooks'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_import(self, file, **options):
+        engine = ImportEngine(**options)
+        import_workbook(file, engine)
+        return engine.results
+
+    def test_results_and_row_errors(self):
+        results = self.run_import(xlsx())
+        self.assertEqual(results, {
+            'schools_created': 2,
+            'classes_created': 2,
+            'students_created': 3,
+            'errors': ERRORS,
+        })
+        self.assertEqual(
+            set(Student.objects.values_list('last_name', 'school_class__name')),
+            {('Lovelace', '9A'), ('Turing', '9A'), ('Hopper', '10A')}
+        )
+        self.assertEqual(SchoolClass.objects.get(name='9A').stats.student_count, 2)
+
+    def test_reimport_creates_nothing(self):
+        self.run_import(xlsx())
+        results = self.run_import(xlsx())
+        self.assertEqual(results['students_created'], 0)
+        self.assertEqual(results['errors'], ERRORS)
+        self.assertEqual(Student.objects.count(), 3)
+
+    def test_upsert_counts_changed_and_unchanged_rows(self):
+        self.run_import(xlsx())
+        students = [list(row) for row in STUDENTS]
+        students[1][6] = 'ada@lovelace.example.com'
+        results = self.run_import(xlsx(students=students), mode=MODE_UPSERT)
+        self.assertEqual(results['students_updated'], 1)
+        self.assertEqual(results['schools_updated'] + results['classes_updated'], 0)
+        # Two schools, two classes and two students
+        self.assertEqual(results['unchanged'], 6)
+        self.assertEqual(Student.objects.get(student_id='S1').email, 'ada@lovelace.example.com')
+
+    def test_upsert_leaves_missing_columns_alone(self):
+        self.run_import(xlsx())
+        students = csv([
+            ['first_name', 'last_name', 'student_id', 'school_name', 'class_name', 'parent_contact'],
+            ['Ada', 'Lovelace', 'S1', 'East', '9A', '555-0199'],
+            ['Alan', 'Turing', 'S2', 'East', '9A', '555-0102'],
+        ], 'students.csv')
+        results = self.run_import(students, mode=MODE_UPSERT)
+        self.assertEqual((results['students_updated'], results['unchanged']), (1, 1))
+        ada = Student.objects.get(student_id='S1')
+        self.assertEqual(ada.parent_contact, '555-0199')
+        self.assertEqual((ada.email, ada.address, ada.parent_name), ('ada@example.com', '2 Hill Road', 'Anne'))
+        self.assertEqual(str(ada.date_of_birth), '2009-12-10')
+
+    def test_upsert_keeps_students_in_their_academic_year(self):
+        self.run_import(xlsx())
+        east = School.objects.get(name='East')
+        SchoolClass.objects.create(school=east, name='9A', grade_level=9, academic_year='2025-2026')
+        west = School.objects.get(name='West')
+        SchoolClass.objects.create(school=west, name='10A', grade_level=10, academic_year='2025-2026')
+        old = SchoolClass.objects.get(name='9A', academic_year='2024-2025')
+        students = [list(row) for row in STUDENTS]
+        students[1][6] = 'ada@lovelace.example.com'
+        results = self.run_import(xlsx(students=students), mode=MODE_UPSERT)
+        self.assertEqual((results['students_created'], results['students_updated']), (0, 1))
+        self.assertEqual(Student.objects.get(student_id='S1').school_class, old)
+        self.assertEqual(Student.objects.get(first_name='Alan').school_class, old)
+        # Students without a student_id are matched by name in any year's class
+        grace = Student.objects.get(first_name='Grace')
+        self.assertEqual(grace.school_class.academic_year, '2024-2025')
+
+    def test_students_academic_year_picks_the_class(self):
+        self.run_import(xlsx())
+        east = School.objects.get(name='East')
+        new = SchoolClass.objects.create(school=east, name='9A', grade_level=9, academic_year='2025-2026')
+        students = csv([
+            ['first_name', 'last_name', 'student_id', 'school_name', 'class_name', 'academic_year'],
+            ['Ada', 'Lovelace', 'S1', 'East', '9A', '2025-2026'],
+            ['Alan', 'Turing', '', 'East', '9A', '2023-2024'],
+        ], 'students.csv')
+        results = self.run_import(students, mode=MODE_UPSERT)
+        self.assertEqual(results['students_updated'], 1)
+        self.assertEqual(results['errors'], [
+            "Class '9A (2023-2024)' does not exist in school 'East' for student 'Alan Turing'"
+        ])
+        self.assertEqual(Student.objects.get(student_id='S1').school_class, new)
+
+    def test_export_imports_back_into_the_same_classes(self):
+        self.run_import(xlsx())
+        east = School.objects.get(name='East')
+        new = SchoolClass.objects.create(school=east, name='9A', grade_level=9, academic_year='2025-2026')
+        Student.objects.create(
+            first_name='Kurt', last_name='Godel', student_id='S9', email='', school=east, school_class=new
+        )
+        fields = ['first_name', 'last_name', 'student_id', 'date_of_birth', 'email', 'school_class_id']
+        students = set(Student.objects.values_list(*fields))
+        exported = io.BytesIO(build_xlsx().read())
+        exported.name = 'export.xlsx'
+
+        results = self.run_import(exported, mode=MODE_UPSERT)
+        self.assertEqual(results['errors'], [])
+        self.assertEqual(results['unchanged'], 2 + 3 + 4)
+
+        Student.objects.all().delete()
+        exported.seek(0)
+        self.assertEqual(self.run_import(exported)['students_created'], 4)
+        self.assertEqual(set(Student.objects.values_list(*fields)), students)
+
+    def test_resubmitted_file_returns_the_earlier_job(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('staff'))
+        # Saved workbooks embed their creation time, so upload the same bytes each time
+        content = xlsx().getvalue()
+
+        def upload(**data):
+            file = io.BytesIO(content)
+            file.name = 'import.xlsx'
+            return client.post('/api/import-excel/', {'file': file, **data}, format='multipart')
+
+        first = upload()
+        again = upload()
+        self.assertEqual((first.status_code, again.status_code), (202, 202))
+        self.assertEqual(again.data['id'], first.data['id'])
+
+        # Another mode or force=1 queues a new job that shares the stored file
+        upsert = upload(mode=MODE_UPSERT)
+        forced = upload(force='1')
+        self.assertEqual(len({first.data['id'], upsert.data['id'], forced.data['id']}), 3)
+        self.assertEqual(len(set(ImportJob.objects.values_list('file', flat=True))), 1)
+
+    def test_reimported_file_is_read_from_the_workbook_cache(self):
+        content = xlsx().getvalue()
+
+        def import_job():
+            job = ImportJob.objects.create(
+                file=ContentFile(content, name='import.xlsx'), original_name='import.xlsx',
+                content_hash='abc', status=ImportJob.STATUS_RUNNING
+            )
+            run_import_job(job)
+            job.refresh_from_db()
+            return job
+
+        self.assertEqual(import_job().errors, ERRORS)
+        with mock.patch.object(workbook_cache, 'open_source') as open_source:
+            job = import_job()
+        open_source.assert_not_called()
+        self.assertEqual((job.status, job.errors), (ImportJob.STATUS_COMPLETED, ERRORS))
+
+    def test_resume_after_failure(self):
+        job = ImportJob.objects.create(
+            file=ContentFile(xlsx().getvalue(), name='import.xlsx'),
+            original_name='import.xlsx',
+            status=ImportJob.STATUS_RUNNING
+        )
+
+        # The second batch of students fails, after the first was committed
+        import_students = ImportEngine.import_students
+        calls = []
+
+        def flaky(engine, rows, partition=0):
+            calls.append(rows)
+            if len(calls) == 2:
+                raise RuntimeError('Connection lost')
+            return import_students(engine, rows, partition)
+
+        with mock.patch.object(importer, 'ImportEngine', functools.partial(ImportEngine, batch_size=2)), \
+                mock.patch.object(ImportEngine, 'import_students', flaky):
+            run_import_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+        self.assertEqual(job.checkpoint, {'sheet': 'Students', 'offsets': [2]})
+        self.assertEqual(job.errors[-1], 'Error processing file: Connection lost')
+        self.assertEqual(Student.objects.count(), 2)
+
+        job = resume_job(resume_token(job))
+        with mock.patch.object(importer, 'ImportEngine', functools.partial(ImportEngine, batch_size=2)):
+            run_import_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED)
+        self.assertEqual(job.checkpoint, {})
+        self.assertEqual((job.schools_created, job.classes_created, job.students_created), (2, 2, 3))
+        self.assertEqual(Student.objects.count(), 3)
+        self.assertEqual(SchoolClass.objects.get(name='9A').stats.student_count, 2)
+
+
+    def test_rolled_back_batch_reports_no_errors(self):
+        job = ImportJob.objects.create(
+            file=ContentFile(xlsx().getvalue(), name='import.xlsx'),
+            original_name='import.xlsx',
+            status=ImportJob.STATUS_RUNNING
+        )
+        # The second student batch holds the 'Bad Class' row and fails after reporting it
+        with mock.patch.object(importer, 'ImportEngine', functools.partial(ImportEngine, batch_size=2)), \
+                mock.patch.object(importer, 'find_students', side_effect=[{}, RuntimeError('Connection lost')]):
+            run_import_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.errors, [ERRORS[0], 'Error processing file: Connection lost'])
+
+        job = resume_job(resume_token(job))
+        with mock.patch.object(importer, 'ImportEngine', functools.partial(ImportEngine, batch_size=2)):
+            run_import_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.errors, [ERRORS[0], 'Error processing file: Connection lost'] + ERRORS[1:])
+
+    def crashed_job(self, **fields):
+        """A job whose worker was killed after committing the first student batch"""
+        job = ImportJob.objects.create(
+            file=ContentFile(xlsx().getvalue(), name='import.xlsx'),
+            original_name='import.xlsx',
+            status=ImportJob.STATUS_RUNNING
+        )
+        with mock.patch.object(importer, 'ImportEngine', functools.partial(ImportEngine, batch_size=2)), \
+                mock.patch.object(importer, 'find_students', side_effect=[{}, RuntimeError('Killed')]):
+            run_import_job(job)
+        # What a killed worker leaves behind: still running, with its checkpoint
+        job.refresh_from_db()
+        fields = {
+            'status': ImportJob.STATUS_RUNNING, 'finished_at': None, 'errors': job.errors[:-1],
+            'heartbeat_at': timezone.now() - timedelta(hours=1), 'attempts': 1, **fields
+        }
+        ImportJob.objects.filter(pk=job.pk).update(**fields)
+        return job
+
+    def test_worker_recovers_orphaned_job(self):
+        job = self.crashed_job()
+        self.assertEqual(Student.objects.count(), 2)
+
+        with mock.patch.object(importer, 'ImportEngine', functools.partial(ImportEngine, batch_size=2)):
+            call_command('run_import_worker', '--once', stdout=io.StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED)
+        self.assertEqual((job.students_created, job.attempts), (3, 2))
+        self.assertEqual(Student.objects.count(), 3)
+
+    def test_live_job_is_not_recovered(self):
+        job = self.crashed_job(heartbeat_at=timezone.now())
+        self.assertEqual(recover_stale_jobs(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.STATUS_RUNNING)
+
+    def test_job_fails_after_max_attempts(self):
+        job = self.crashed_job(attempts=MAX_ATTEMPTS)
+        self.assertEqual(recover_stale_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+        self.assertIn('Import worker stopped', job.errors[-1])
+
+        # A resume token still requeues it from its checkpoint
+        job = resume_job(resume_token(job))
+        self.assertEqual((job.status, job.attempts), (ImportJob.STATUS_PENDING, 0))
+
+
+class BulkStudentTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('staff'))
+        self.east = School.objects.create(name='East')
+        west = School.objects.create(name='West')
+        self.east_class = SchoolClass.objects.create(school=self.east, name='9A', grade_level='9')
+        west_class = SchoolClass.objects.create(school=west, name='9A', grade_level='9')
+        for n, school_class in enumerate([self.east_class, self.east_class, west_class]):
+            Student.objects.create(first_name='Student', last_name=str(n), student_id=f'S{n}',
+                                   school=school_class.school, school_class=school_class)
+
+    def test_bulk_delete_requires_a_filter_value(self):
+        for query in ['', '?school=', '?search=%20', '?school=&student_id=']:
+            response = self.client.post(f'/api/students/bulk-delete/{query}')
+            self.assertEqual(response.status_code, 400, query)
+        self.assertEqual(Student.objects.count(), 3)
+
+    def test_bulk_delete_filtered(self):
+        response = self.client.post(f'/api/students/bulk-delete/?school={self.east.pk}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'deleted': 2})
+        self.assertEqual(list(Student.objects.values_list('school__name', flat=True)), ['West'])
+
+    @mock.patch('core.bulk.DELETE_BATCH_SIZE', 1)
+    def test_bulk_delete_logs_and_counts_once(self):
+        ids = list(Student.objects.filter(school=self.east).values_list('pk', flat=True))
+        with mock.patch('core.bulk.bump_version') as bump, mock.patch('core.signals.bump_version') as signal_bump, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(delete_students(Student.objects.filter(school=self.east)), 2)
+        bump.assert_called_once_with(Student)
+        signal_bump.assert_not_called()
+        deletes = Change.objects.filter(entity='students', action=Change.ACTION_DELETE)
+        self.assertEqual(sorted(deletes.values_list('object_id', flat=True)), ids)
+        self.assertEqual(school_stats(self.east.pk)['student_count'], 0)
+
+    def test_move_requires_a_filter_value(self):
+        response = self.client.post('/api/students/move/?school=', {'school_class': self.east_class.pk}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Student.objects.filter(school_class=self.east_class).count(), 2)
+
+
+class ClassConstraintTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('staff'))
+        self.school = School.objects.create(name='S1')
+
+    def test_duplicate_class_without_academic_year(self):
+        SchoolClass.objects.create(school=self.school, name='C1')
+        with self.assertRaises(IntegrityError):
+            SchoolClass.objects.create(school=self.school, name='C1')
+
+    def test_add_class_twice(self):
+        data = {'name': 'C1', 'school_name': 'S1'}
+        self.assertEqual(self.client.post('/api/add-class/', data, format='json').status_code, 201)
+        self.assertEqual(self.client.post('/api/add-class/', data, format='json').status_code, 400)
+        self.assertEqual(SchoolClass.objects.filter(name='C1').count(), 1)
+
+    def test_add_classes_batch_rejects_duplicates(self):
+        data = [{'name': 'C1', 'school_name': 'S1'}, {'name': 'C1', 'school_name': 'S1'}]
+        response = self.client.post('/api/add-class/', data, format='json')
+        self.assertEqual((response.data['created'], response.data['failed']), (1, 1))
+        self.assertEqual(SchoolClass.objects.filter(name='C1').count(), 1)
+
+    def test_null_academic_year_is_stored_blank(self):
+        data = {'name': 'C1', 'school': self.school.id, 'academic_year': None}
+        self.assertEqual(self.client.post('/api/classes/', data, format='json').status_code, 201)
+        data = [{'name': 'C2', 'school_name': 'S1', 'academic_year': None}]
+        self.assertEqual(self.client.post('/api/add-class/', data, format='json').data['created'], 1)
+        data = {'name': 'C3', 'school_name': 'S1', 'academic_year': None}
+        self.assertEqual(self.client.post('/api/add-class/', data, format='json').status_code, 201)
+        self.assertEqual(
+            set(SchoolClass.objects.values_list('name', 'academic_year')),
+            {('C1', ''), ('C2', ''), ('C3', '')}
+        )
+
+
+class ExportStreamingTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('staff')
+        school = School.objects.create(name='East')
+        school_class = SchoolClass.objects.create(school=school, name='9A', academic_year='2024-2025')
+        for n in range(3):
+            Student.objects.create(first_name='Student', last_name=str(n), school=school, school_class=school_class)
+
+    def asgi_get(self, view, path):
+        request = AsyncRequestFactory().get(path)
+        force_authenticate(request, self.user)
+        return view(request)
+
+    def test_export_streams_under_asgi(self):
+        # Sync streaming content would be read into one list before sending
+        for query in ['type=csv', 'type=ndjson', 'type=xlsx']:
+            response = self.asgi_get(export_data, f'/api/export/?{query}')
+            self.assertTrue(response.is_async, query)
+
+        response = self.asgi_get(export_data, '/api/export/?type=csv')
+        content = async_to_sync(collect)(response)
+        self.assertEqual(content.decode().splitlines()[1:], [
+            'Student,0,,,East,9A,2024-2025,,,,', 'Student,1,,,East,9A,2024-2025,,,,',
+            'Student,2,,,East,9A,2024-2025,,,,'
+        ])
+
+    @mock.patch('core.changes.FEED_DELAY', timedelta(0))
+    def test_changes_stream_under_asgi(self):
+        response = self.asgi_get(changes, '/api/changes/?since=0&entity=students')
+        self.assertTrue(response.is_async)
+        lines = async_to_sync(collect)(response).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+
+    def test_export_streams_under_wsgi(self):
+        request = RequestFactory().get('/api/export/?type=csv')
+        force_authenticate(request, self.user)
+        response = export_data(request)
+        self.assertFalse(response.is_async)
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 4)
+
+
+class MergeDuplicatesMigrationTests(TransactionTestCase):
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.migrate([('core', target)])
+        executor.loader.build_graph()
+        return executor.loader.project_state([('core', target)]).apps
+
+    def test_duplicate_student_ids_are_renamed_not_deleted(self):
+        apps = self.migrate('0002_importjob')
+        self.addCleanup(self.migrate, MigrationLoader(connection).graph.leaf_nodes('core')[0][1])
+        School = apps.get_model('core', 'School')
+        SchoolClass = apps.get_model('core', 'SchoolClass')
+        Student = apps.get_model('core', 'Student')
+        east = School.objects.create(name='East')
+        # Two schools of the same name are merged, and their students with them
+        other = School.objects.create(name='East')
+        ids = []
+        for school in (east, other):
+            school_class = SchoolClass.objects.create(school=school, name='9A')
+            ids.append(Student.objects.create(
+                first_name='Ada', last_name='Lovelace', student_id='S1', school=school, school_class=school_class
+            ).pk)
+
+        with mock.patch('builtins.print'):
+            apps = self.migrate('0003_merge_duplicate_natural_keys')
+        Student = apps.get_model('core', 'Student')
+        self.assertEqual(
+            list(Student.objects.order_by('pk').values_list('student_id', 'school_id')),
+            [('S1', east.pk), (f'S1-{ids[1]}', east.pk)]
+        )
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ResponseCacheTests(TestCase):
+
+    def setUp(self):
+        caches['api'].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('staff'))
+        self.school = School.objects.create(name='East')
+
+    def test_conditional_requests_get_304_until_a_write(self):
+        response = self.client.get('/api/schools/')
+        etag = response['ETag']
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/api/schools/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(
+            self.client.get('/api/schools/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/schools/', {'name': 'West'}, format='json')
+        response = self.client.get('/api/schools/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([school['name'] for school in response.data['results']], ['East', 'West'])
+
+    def test_writes_to_related_models_invalidate(self):
+        self.client.get('/api/schools/')
+        # Bulk updates skip the signals, so the cached response is served
+        School.objects.filter(pk=self.school.pk).update(name='Renamed')
+        self.assertEqual(self.client.get('/api/schools/').data['results'][0]['name'], 'East')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            SchoolClass.objects.create(school=self.school, name='9A')
+        self.assertEqual(self.client.get('/api/schools/').data['results'][0]['name'], 'Renamed')
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ListFilterTests(TestCase):
+
+    def setUp(self):
+        caches['api'].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('staff'))
+        east = School.objects.create(name='East')
+        west = School.objects.create(name='West')
+        nine = SchoolClass.objects.create(school=east, name='9A', grade_level='9', academic_year='2024-2025')
+        ten = SchoolClass.objects.create(school=west, name='10A', grade_level='10', academic_year='2025-2026')
+        Student.objects.create(first_name='Ada', last_name='Lovelace', student_id='S1', school=east, school_class=nine)
+        Student.objects.create(first_name='Alan', last_name='Turing', student_id='S2', school=east, school_class=nine)
+        Student.objects.create(first_name='Grace', last_name='Hopper', student_id='S3', school=west, school_class=ten)
+
+    def names(self, query):
+        response = self.client.get(f'/api/students/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return [student['last_name'] for student in response.data['results']]
+
+    def test_filters(self):
+        self.assertEqual(self.names('school_name=East'), ['Lovelace', 'Turing'])
+        self.assertEqual(self.names('school_class__grade_level=10'), ['Hopper'])
+        self.assertEqual(self.names('school_class__academic_year=2024-2025&student_id=S2'), ['Turing'])
+
+    def test_search_and_ordering(self):
+        self.assertEqual(self.names('search=ada'), ['Lovelace'])
+        self.assertEqual(self.names('search=s'), ['Lovelace', 'Turing', 'Hopper'])
+        self.assertEqual(self.names('ordering=-last_name'), ['Turing', 'Lovelace', 'Hopper'])
+
+    def test_unknown_filter_value_is_rejected(self):
+        self.assertEqual(self.client.get('/api/students/?school=nope').status_code, 400)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class FastReadTests(TestCase):
+
+    def setUp(self):
+        caches['api'].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('staff'))
+        school = School.objects.create(name='East')
+        school_class = SchoolClass.objects.create(school=school, name='9A', academic_year='2024-2025')
+        for n in range(3):
+            Student.objects.create(
+                first_name='Student', last_name=str(n), date_of_birth=f'2010-01-0{n + 1}',
+                school=school, school_class=school_class
+            )
+
+    def test_values_list_matches_the_serializer(self):
+        results = self.client.get('/api/students/').data['results']
+        self.assertEqual(results, StudentSerializer(Student.objects.order_by('id'), many=True).data)
+
+    def test_fields_narrow_the_response(self):
+        response = self.client.get('/api/students/?fields=last_name,date_of_birth')
+        self.assertEqual(response.data['results'], [
+            {'last_name': str(n), 'date_of_birth': f'2010-01-0{n + 1}'} for n in range(3)
+        ])
+        # Cursor pages still find their ordering column when it isn't requested
+        response = self.client.get('/api/students/?fields=last_name&pagination=cursor&page_size=2')
+        self.assertEqual([row['last_name'] for row in response.data['results']], ['0', '1'])
+        self.assertEqual(self.client.get(response.data['next']).data['results'], [{'last_name': '2'}])
+
+    def test_invalid_fields(self):
+        self.assertEqual(self.client.get('/api/students/?fields=password').status_code, 400)
+        self.assertEqual(self.client.get('/api/students/?fields=last_name&expand=school').status_code, 400)
+
+
+@mock.patch('core.changes.FEED_DELAY', timedelta(0))
+class ChangeFeedTests(TestCase):
+
+    def feed(self, since=0, entity=None):
+        return [json.loads(line) for line in stream_changes(since, entity)]
+
+    def test_feed_sends_latest_rows_and_tombstones(self):
+        school = School.objects.create(name='East')
+        school_class = SchoolClass.objects.create(school=school, name='9A')
+        ada = Student.objects.create(first_name='Ada', last_name='Byron', school=school, school_class=school_class)
+        ada.last_name = 'Lovelace'
+        ada.save()
+        alan = Student.objects.create(first_name='Alan', last_name='Turing', school=school, school_class=school_class)
+        alan_id = alan.pk
+        alan.delete()
+
+        feed = self.feed()
+        self.assertEqual([(change['entity'], change['action']) for change in feed], [
+            ('schools', 'insert'), ('classes', 'insert'), ('students', 'update'), ('students', 'delete')
+        ])
+        self.assertEqual(feed[2]['data']['last_name'], 'Lovelace')
+        self.assertEqual((feed[3]['id'], feed[3]['data']), (alan_id, None))
+
+        # Clients resume after the last cursor they applied
+        self.assertEqual(self.feed(since=feed[2]['cursor']), feed[3:])
+        self.assertEqual([change['action'] for change in self.feed(entity='classes')], ['insert'])
+
+    def test_recent_changes_are_held_back(self):
+        School.objects.create(name='East')
+        with mock.patch('core.changes.FEED_DELAY', timedelta(minutes=1)):
+            self.assertEqual(self.feed(), [])
+        self.assertEqual(len(self.feed()), 1)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ClassStatsTests(TestCase):
+
+    def setUp(self):
+        caches['api'].clear()
+        self.school = School.objects.create(name='East')
+        self.nine = SchoolClass.objects.create(school=self.school, name='9A', grade_level='9', academic_year='2024-2025')
+        self.ten = SchoolClass.objects.create(school=self.school, name='10A', grade_level='10', academic_year='2025-2026')
+
+    def student(self, name, school_class):
+        return Student.objects.create(first_name=name, last_name='X', school=self.school, school_class=school_class)
+
+    def counts(self):
+        return {row['name']: row['student_count'] for row in school_stats(self.school.pk)['classes']}
+
+    def test_signals_keep_counts_current(self):
+        ada = self.student('Ada', self.nine)
+        self.student('Alan', self.nine)
+        grace = self.student('Grace', self.ten)
+        self.assertEqual(self.counts(), {'9A': 2, '10A': 1})
+
+        ada.school_class = self.ten
+        ada.save()
+        self.assertEqual(self.counts(), {'9A': 1, '10A': 2})
+        grace.delete()
+        self.assertEqual(self.counts(), {'9A': 1, '10A': 1})
+
+    def test_stats_endpoint(self):
+        self.student('Ada', self.nine)
+        self.student('Grace', self.ten)
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('staff'))
+        stats = client.get(f'/api/schools/{self.school.pk}/stats/').data
+        self.assertEqual((stats['class_count'], stats['student_count']), (2, 2))
+        self.assertEqual(client.get(f'/api/schools/{self.school.pk}/stats/academic-years/').data, [
+            {'academic_year': '2024-2025', 'class_count': 1, 'student_count': 1},
+            {'academic_year': '2025-2026', 'class_count': 1, 'student_count': 1},
+        ])
+
+    def test_rebuild_after_bulk_writes(self):
+        Student.objects.bulk_create([
+            Student(first_name=name, last_name='X', school=self.school, school_class=self.nine)
+            for name in ('Ada', 'Alan')
+        ])
+        self.assertEqual(self.counts(), {'9A': 0, '10A': 0})
+        rebuild_class_stats([self.school.pk])
+        self.assertEqual(self.counts(), {'9A': 2, '10A': 0})
+
+
+class DryRunTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('staff'))
+
+    def dry_run(self, file):
+        response = self.client.post('/api/import-excel/', {'file': file, 'dry_run': '1'}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_reports_what_an_import_would_reject(self):
+        students = STUDENTS + [
+            ['Ada', 'Lovelace', 'S1', 'not a date', 'East', '9A', '', '', '', ''],
+            ['', 'Nobody', '', '', 'East', '9A', '', '', '', ''],
+        ]
+        report = self.dry_run(xlsx(students=students))
+        self.assertEqual((report['valid'], report['rows']), (False, {'Schools': 2, 'Classes': 3, 'Students': 7}))
+        self.assertEqual(report['errors'], [
+            "Students row 8: 'first_name' is blank",
+            "Students row 7: 'date_of_birth' is not a valid date: 'not a date'",
+            "Classes row 4: School 'Nowhere' does not exist for class '1A'",
+            "Students row 6: School 'Nowhere' does not exist for student 'No School'",
+            "Students row 5: Class '9Z' does not exist in school 'East' for student 'Bad Class'",
+            "Students row 7: Duplicate student 'Ada Lovelace'",
+        ])
+        self.assertFalse(School.objects.exists())
+        self.assertFalse(ImportJob.objects.exists())
+
+    def test_student_academic_years_are_checked(self):
+        school = School.objects.create(name='East')
+        SchoolClass.objects.create(school=school, name='9A', academic_year='2024-2025')
+        report = self.dry_run(csv([
+            ['first_name', 'last_name', 'student_id', 'school_name', 'class_name', 'academic_year'],
+            ['Ada', 'Lovelace', '12345', 'East', '9A', '2024-2025'],
+            ['Alan', 'Turing', '', 'East', '9A', ''],
+            ['Grace', 'Hopper', '', 'East', '9A', '2025-2026'],
+        ], 'students.csv'))
+        self.assertEqual(report['errors'], [
+            "Students row 4: Class '9A (2025-2026)' does not exist in school 'East' for student 'Grace Hopper'",
+        ])
+
+    def test_columns_are_cleaned_like_the_importer(self):
+        cells = [12345.0, '12345.0', '007', 7, 3.5, None, float('nan'), '', date(2010, 1, 2)]
+        frame = pd.DataFrame({'student_id': cells}, dtype=object)
+        self.assertEqual(list(_text(frame, 'student_id')), [clean_value(cell) for cell in cells])
+
+    @mock.patch('core.views.DRY_RUN_MAX_BYTES', 10)
+    def test_large_files_are_refused(self):
+        response = self.client.post('/api/import-excel/', {'file': xlsx(), 'dry_run': '1'}, format='multipart')
+        self.assertEqual(response.status_code, 413)
+
+
+class MetricsTests(TestCase):
+
+    def test_series_carry_the_worker_pid(self):
+        registry = MetricsRegistry()
+        registry.record('school-list', 'GET', 200, 0.02, 3, 0.01, 512, False)
+        lines = registry.render().splitlines()
+        self.assertIn(f'api_requests_total{{view="school-list",method="GET",status="200",pid="{os.getpid()}"}} 1', lines)
+        self.assertIn(f'api_db_queries_total{{view="school-list",method="GET",pid="{os.getpid()}"}} 3', lines)
@@ -1,19 +1,23 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
-    SchoolViewSet, SchoolClassViewSet, StudentViewSet, 
-    import_excel_data, import_page, add_school, add_class, add_student
+    SchoolViewSet, SchoolClassViewSet, StudentViewSet, ImportJobViewSet,
+    import_excel_data, import_page, export_data, changes, metrics, add_school, add_class, add_student
 )
 
 router = DefaultRouter()
 router.register(r'schools', SchoolViewSet)
 router.register(r'classes', SchoolClassViewSet)
 router.register(r'students', StudentViewSet)
+router.register(r'import-jobs', ImportJobViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
     path('import-excel/', import_excel_data, name='import-excel'),
     path('import/', import_page, name='import-page'),
+    path('export/', export_data, name='export'),
+    path('changes/', changes, name='changes'),
+    path('metrics/', metrics, name='metrics'),
     
     # New simple endpoints for automation tools
     path('add-school/', add_school, name='add-school'),
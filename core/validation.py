@@ -0,0 +1,188 @@
+import pandas as pd
+from django.conf import settings
+from .models import School, SchoolClass
+from .readers import SHEETS, file_format, open_source
+
+# Largest upload the dry run accepts (see IMPORT_DRY_RUN_MAX_MB)
+MAX_BYTES = getattr(settings, 'IMPORT_DRY_RUN_MAX_MB', 20) * 1024 * 1024
+
+# Columns that must be present and non-blank on every row of a sheet
+REQUIRED_COLUMNS = {
+    'Schools': ['name'],
+    'Classes': ['school_name', 'name'],
+    'Students': ['first_name', 'last_name', 'school_name', 'class_name'],
+}
+
+# Columns parsed as dates
+DATE_COLUMNS = {
+    'Students': ['date_of_birth'],
+}
+
+# Columns that are checked when present
+OPTIONAL_COLUMNS = {
+    'Classes': ['academic_year'],
+    'Students': ['student_id', 'academic_year'],
+}
+
+# pandas 2 infers one format from the first value unless told the column is mixed
+DATE_OPTIONS = {'format': 'mixed'} if int(pd.__version__.split('.')[0]) >= 2 else {}
+
+
+def checked_columns(sheet):
+    return set(REQUIRED_COLUMNS[sheet] + DATE_COLUMNS.get(sheet, []) + OPTIONAL_COLUMNS.get(sheet, []))
+
+
+def read_sheets(file, name=None, entity=None):
+    """
+    Load the checked columns of the importable sheets of an upload into
+    DataFrames of raw cell values. Every row is held in memory, which is
+    what IMPORT_DRY_RUN_MAX_MB bounds.
+    """
+    name = name or getattr(file, 'name', None) or str(file)
+    detected = file_format(name)
+    if detected and detected[0] != 'xlsx':
+        # CSV, TSV and NDJSON rows come from the same streaming readers as the import
+        source = open_source(file, name, entity)
+        try:
+            sheets = {}
+            for sheet in SHEETS:
+                if sheet in source.sheetnames:
+                    columns = checked_columns(sheet)
+                    rows = [
+                        {column: value for column, value in row.items() if column in columns}
+                        for row in source.rows(sheet)
+                    ]
+                    sheets[sheet] = pd.DataFrame(rows, dtype=object)
+            return sheets
+        finally:
+            source.close()
+
+    with pd.ExcelFile(file, engine='openpyxl') as workbook:
+        sheets = {}
+        for sheet in SHEETS:
+            if sheet in workbook.sheet_names:
+                columns = checked_columns(sheet)
+                frame = workbook.parse(
+                    sheet, dtype=object, usecols=lambda column: str(column) in columns
+                ).dropna(how='all')
+                frame.columns = [str(column) for column in frame.columns]
+                sheets[sheet] = frame
+    return sheets
+
+
+def _text(frame, column):
+    """A column normalised like the importer's clean_value ('' for missing columns)"""
+    if column not in frame.columns:
+        return pd.Series('', index=frame.index, dtype=object)
+    values = frame[column].fillna('')
+    text = values.astype(str)
+    # Excel stores numeric ids as floats, e.g. 12345.0. Cells that were
+    # already text compare equal to their string and are left alone.
+    converted = text != values
+    return text.mask(converted, text.str.replace(r'^(-?\d+)\.0$', r'\1', regex=True))
+
+
+class WorkbookValidator:
+    """
+    Check a workbook without writing anything.
+
+    Each check runs over a whole column at once: blank and duplicate keys
+    with pandas masks, dates with one pd.to_datetime call per column, and
+    school/class references by set membership against the names already in
+    the database (fetched in one query each) plus those in the workbook.
+    """
+
+    def __init__(self, sheets):
+        self.sheets = sheets
+        self.errors = []
+
+    def error(self, sheet, rows, message):
+        """Report ``message``, formatted with each row's columns, for every row"""
+        for index, row in zip(rows.index, rows.to_dict('records')):
+            # Row numbers as shown in Excel: the header is row 1
+            self.errors.append(f"{sheet} row {index + 2}: {message.format(**row)}")
+
+    def validate(self):
+        for sheet, frame in self.sheets.items():
+            missing = [column for column in REQUIRED_COLUMNS[sheet] if column not in frame.columns]
+            if missing:
+                self.errors.append(f"{sheet}: missing required column(s) {', '.join(missing)}")
+                continue
+            for column in REQUIRED_COLUMNS[sheet]:
+                self.error(sheet, frame[_text(frame, column) == ''], f"'{column}' is blank")
+            for column in DATE_COLUMNS.get(sheet, []):
+                if column in frame.columns:
+                    self.check_dates(sheet, frame, column)
+
+        school_names = set(School.objects.values_list('name', flat=True))
+        class_names = set(SchoolClass.objects.values_list('school__name', 'name', 'academic_year'))
+        if 'Schools' in self.sheets:
+            school_names |= self.check_schools(self.keys('Schools'))
+        if 'Classes' in self.sheets:
+            class_names |= self.check_classes(self.keys('Classes'), school_names)
+        if 'Students' in self.sheets:
+            self.check_students(self.keys('Students'), school_names, class_names)
+        return self.errors
+
+    def keys(self, sheet):
+        """Cleaned key columns of the rows whose required columns are all filled in"""
+        frame = self.sheets[sheet]
+        columns = REQUIRED_COLUMNS[sheet]
+        optional = OPTIONAL_COLUMNS.get(sheet, [])
+        if not set(columns) <= set(frame.columns):
+            return pd.DataFrame(columns=columns + optional)
+        keys = pd.DataFrame({column: _text(frame, column) for column in columns + optional})
+        return keys[(keys[columns] != '').all(axis=1)]
+
+    def check_dates(self, sheet, frame, column):
+        values = frame[column]
+        parsed = pd.to_datetime(values, errors='coerce', **DATE_OPTIONS)
+        invalid = (_text(frame, column) != '') & parsed.isna()
+        self.error(sheet, frame[invalid], f"'{column}' is not a valid date: {{{column}!r}}")
+
+    def check_schools(self, keys):
+        self.error('Schools', keys[keys.duplicated()], "Duplicate school '{name}'")
+        return set(keys['name'])
+
+    def check_classes(self, keys, school_names):
+        unknown = ~keys['school_name'].isin(school_names)
+        self.error('Classes', keys[unknown], "School '{school_name}' does not exist for class '{name}'")
+        self.error('Classes', keys[keys.duplicated()], "Duplicate class '{name}' in school '{school_name}'")
+        return set(zip(keys['school_name'], keys['name'], keys['academic_year']))
+
+    def check_students(self, keys, school_names, class_names):
+        unknown_school = ~keys['school_name'].isin(school_names)
+        self.error('Students', keys[unknown_school],
+                   "School '{school_name}' does not exist for student '{first_name} {last_name}'")
+
+        # A row with an academic year needs that year's class, otherwise any year will do
+        pairs = pd.MultiIndex.from_frame(keys[['school_name', 'class_name']])
+        years = pd.MultiIndex.from_frame(keys[['school_name', 'class_name', 'academic_year']])
+        with_year = keys['academic_year'] != ''
+        unknown_pair = ~unknown_school & ~with_year & ~pairs.isin([name[:2] for name in class_names])
+        unknown_year = ~unknown_school & with_year & ~years.isin(list(class_names))
+        self.error('Students', keys[unknown_pair],
+                   "Class '{class_name}' does not exist in school '{school_name}' for student '{first_name} {last_name}'")
+        self.error('Students', keys[unknown_year],
+                   "Class '{class_name} ({academic_year})' does not exist in school '{school_name}' "
+                   "for student '{first_name} {last_name}'")
+
+        # Same natural key as the importer: student_id per school, else name and class
+        with_id = keys['student_id'] != ''
+        duplicated = pd.concat([
+            keys[with_id].duplicated(['school_name', 'student_id']),
+            keys[~with_id].duplicated(['school_name', 'class_name', 'first_name', 'last_name']),
+        ]).reindex(keys.index)
+        self.error('Students', keys[duplicated], "Duplicate student '{first_name} {last_name}'")
+
+
+def validate_workbook(file, name=None, entity=None):
+    """Validate an upload and return a report of everything an import would reject"""
+    sheets = read_sheets(file, name, entity)
+    errors = WorkbookValidator(sheets).validate()
+    return {
+        'dry_run': True,
+        'valid': not errors,
+        'rows': {sheet: len(frame) for sheet, frame in sheets.items()},
+        'errors': errors,
+    }
@@ -1,175 +1,445 @@
+import logging
+from functools import lru_cache
+from adrf.decorators import api_view as async_api_view
+from asgiref.sync import sync_to_async
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import action, api_view
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import SearchFilter
 from rest_framework.response import Response
+from django.core.files.storage import default_storage
+from django.core.validators import EMPTY_VALUES
+from django.db import IntegrityError, transaction
+from django_filters.rest_framework import DjangoFilterBackend
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from django.shortcuts import render
-from .models import School, SchoolClass, Student
-from .serializers import SchoolSerializer, SchoolClassSerializer, StudentSerializer
-import pandas as pd
+from .models import School, SchoolClass, Student, ImportJob
+from .serializers import (
+    SchoolSerializer, SchoolClassSerializer, StudentSerializer, ImportJobSerializer,
+    ExpandableSchoolSerializer, ExpandableSchoolClassSerializer, ExpandableStudentSerializer,
+    ValuesSerializer, MoveStudentsSerializer, PromoteGradeSerializer
+)
+from .cache import CachedResponseMixin
+from .filters import SchoolFilter, SchoolClassFilter, StudentFilter, StableOrderingFilter
+from .pagination import PaginationModeMixin
+from .batch import check_batch, create_schools, create_classes, create_students
+from .bulk import delete_students, move_students, promote_grade
+from .changes import CHUNK_SIZE as CHANGES_CHUNK_SIZE, stream_changes
+from .importer import MODE_CREATE, MODES, resume_job
+from .exporter import build_xlsx, stream_csv, stream_ndjson
+from .metrics import registry
+from .readers import ENTITIES, TEXT_FORMATS, entity_sheet, file_format
+from .stats import school_stats
+from .streaming import stream
+from .validation import MAX_BYTES as DRY_RUN_MAX_BYTES, validate_workbook
+from .workbook_cache import content_hash
 
-class SchoolViewSet(viewsets.ModelViewSet):
-    queryset = School.objects.all()
-    serializer_class = SchoolSerializer
+logger = logging.getLogger(__name__)
 
-class SchoolClassViewSet(viewsets.ModelViewSet):
-    queryset = SchoolClass.objects.all()
-    serializer_class = SchoolClassSerializer
+class ExpandMixin:
+    """
+    Adds ``?expand=field1,field2`` nested serialization to a viewset.
+    Expanded relations are loaded with select_related/prefetch_related, so
+    a page costs the same number of queries however many rows it holds.
+    """
+    # Expandable relations loaded with select_related / prefetch_related
+    select_expand = ()
+    prefetch_expand = ()
 
-class StudentViewSet(viewsets.ModelViewSet):
-    queryset = Student.objects.all()
-    serializer_class = StudentSerializer
+    def get_expand(self):
+        if not hasattr(self, '_expand'):
+            requested = self.request.query_params.get('expand', '') if self.request else ''
+            names = [name.strip() for name in requested.split(',') if name.strip()]
+            allowed = self.select_expand + self.prefetch_expand
+            unknown = [name for name in names if name not in allowed]
+            if unknown:
+                raise ValidationError({'expand': f"Cannot expand {', '.join(unknown)}. Choose from: {', '.join(allowed)}"})
+            self._expand = names
+        return self._expand
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        expand = self.get_expand()
+        select = [name for name in expand if name in self.select_expand]
+        prefetch = [name for name in expand if name in self.prefetch_expand]
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        # Writes always use the plain serializer
+        if self.request is not None and self.request.method in ('GET', 'HEAD', 'OPTIONS'):
+            context['expand'] = self.get_expand()
+        return context
+
+@lru_cache(maxsize=None)
+def _serializer_field_names(serializer_class):
+    # Building ModelSerializer fields is costly, so do it once per class
+    return list(serializer_class().fields)
+
+class FastReadMixin:
+    """
+    Serves list requests from a QuerySet.values() query rendered by
+    ValuesSerializer instead of the ModelSerializer. ``?fields=a,b`` narrows
+    both the response and the SELECT column list. Expanded lists and all
+    writes keep using the regular serializers.
+    """
+    # Serializer whose field names define the default read fields
+    read_serializer_class = None
+
+    def get_read_fields(self):
+        available = _serializer_field_names(self.read_serializer_class)
+        requested = self.request.query_params.get('fields')
+        if not requested:
+            return available
+        fields = [name.strip() for name in requested.split(',') if name.strip()]
+        unknown = [name for name in fields if name not in available]
+        if unknown:
+            raise ValidationError({'fields': f"Unknown fields {', '.join(unknown)}. Choose from: {', '.join(available)}"})
+        return fields
+
+    def list(self, request, *args, **kwargs):
+        if self.get_expand():
+            if request.query_params.get('fields'):
+                raise ValidationError({'fields': 'fields cannot be combined with expand'})
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        fields = self.get_read_fields()
+        # Cursor pagination reads the ordering columns from each row
+        ordering = [name.lstrip('-') for name in queryset.query.order_by]
+        columns = fields + [name for name in ordering if name not in fields]
+        serializer = ValuesSerializer(queryset.model, fields)
+
+        page = self.paginate_queryset(queryset.values(*columns))
+        if page is not None:
+            return self.get_paginated_response(serializer.to_representation(page))
+        return Response(serializer.to_representation(queryset.values(*columns)))
+
+# Filters, ?search= and ?ordering= for the list endpoints. Search uses
+# icontains, which the trigram indexes from migration 0007 serve on PostgreSQL.
+FILTER_BACKENDS = [DjangoFilterBackend, SearchFilter, StableOrderingFilter]
+
+class SchoolViewSet(CachedResponseMixin, ExpandMixin, FastReadMixin, PaginationModeMixin, viewsets.ModelViewSet):
+    queryset = School.objects.order_by('id')
+    serializer_class = ExpandableSchoolSerializer
+    read_serializer_class = SchoolSerializer
+    prefetch_expand = ('classes',)
+    cache_models = (School, SchoolClass)
+    filter_backends = FILTER_BACKENDS
+    filterset_class = SchoolFilter
+    search_fields = ['name']
+    ordering_fields = ['id', 'name']
+    ordering = ['id']
+
+    # Roster statistics, read from the ClassStats summary table
+    def _stats(self, part=None):
+        stats = school_stats(self.get_object().pk)
+        return Response(stats[part] if part else stats)
+
+    @action(detail=True)
+    def stats(self, request, pk=None):
+        """Class, student, grade level and academic year counts of a school"""
+        return self._stats()
+
+    @action(detail=True, url_path='stats/classes')
+    def class_stats(self, request, pk=None):
+        """Students per class"""
+        return self._stats('classes')
+
+    @action(detail=True, url_path='stats/grade-levels')
+    def grade_level_stats(self, request, pk=None):
+        """Classes and students per grade level"""
+        return self._stats('grade_levels')
+
+    @action(detail=True, url_path='stats/academic-years')
+    def academic_year_stats(self, request, pk=None):
+        """Classes and students per academic year"""
+        return self._stats('academic_years')
+
+class SchoolClassViewSet(CachedResponseMixin, ExpandMixin, FastReadMixin, PaginationModeMixin, viewsets.ModelViewSet):
+    queryset = SchoolClass.objects.order_by('id')
+    serializer_class = ExpandableSchoolClassSerializer
+    read_serializer_class = SchoolClassSerializer
+    select_expand = ('school',)
+    cache_models = (SchoolClass, School)
+    filter_backends = FILTER_BACKENDS
+    filterset_class = SchoolClassFilter
+    search_fields = ['name', 'school__name']
+    ordering_fields = ['id', 'name', 'grade_level', 'academic_year']
+    ordering = ['id']
+
+    @action(detail=False, methods=['post'])
+    def promote(self, request):
+        """Move every student of a grade to next year's classes and archive the old ones"""
+        serializer = PromoteGradeSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        options = dict(serializer.validated_data)
+        if 'school' in options:
+            options['school'] = options['school'].pk
+        try:
+            result = promote_grade(**options)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result)
+
+class StudentViewSet(CachedResponseMixin, ExpandMixin, FastReadMixin, PaginationModeMixin, viewsets.ModelViewSet):
+    queryset = Student.objects.order_by('id')
+    serializer_class = ExpandableStudentSerializer
+    read_serializer_class = StudentSerializer
+    select_expand = ('school', 'school_class')
+    cache_models = (Student, SchoolClass, School)
+    filter_backends = FILTER_BACKENDS
+    filterset_class = StudentFilter
+    search_fields = ['first_name', 'last_name', 'student_id']
+    ordering_fields = ['id', 'last_name', 'first_name', 'student_id']
+    ordering = ['id']
+
+    # Bulk operations act on the students matching the list filters in the query string
+    def _filtered_students(self, request):
+        # A filter passed empty (?school=) is dropped by django-filter and
+        # would match every student, so only filters with a value count
+        filterset = self.filterset_class(request.query_params, queryset=Student.objects.all(), request=request)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        filtered = [name for name, value in filterset.form.cleaned_data.items() if value not in EMPTY_VALUES]
+        if not filtered and not request.query_params.get(SearchFilter.search_param, '').strip():
+            filters = set(self.filterset_class.base_filters) | {SearchFilter.search_param}
+            raise ValidationError({'filters': f"Pass at least one filter with a value: {', '.join(sorted(filters))}"})
+        return self.filter_queryset(Student.objects.all())
+
+    @action(detail=False, methods=['post'])
+    def move(self, request):
+        """Move the filtered students into the class given in the body"""
+        serializer = MoveStudentsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            moved = move_students(self._filtered_students(request), serializer.validated_data['school_class'])
+        except IntegrityError:
+            return Response({'error': 'Moving would duplicate student ids in the target school'},
+                            status=status.HTTP_409_CONFLICT)
+        return Response({'moved': moved})
+
+    @action(detail=False, methods=['post'], url_path='bulk-delete')
+    def bulk_delete(self, request):
+        """Delete the filtered students"""
+        return Response({'deleted': delete_students(self._filtered_students(request))})
+
+class ImportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Status of queued and finished imports"""
+    queryset = ImportJob.objects.all()
+    serializer_class = ImportJobSerializer
 
 @api_view(['POST'])
 def import_excel_data(request):
-    """Import all data from an Excel file"""
+    """
+    Queue an Excel workbook, CSV/TSV/NDJSON file (optionally gzipped) or zip
+    of them for import and return the job to poll, or just validate it with
+    ?dry_run=1
+    """
+    # A failed job's resume_token requeues it from its last checkpoint
+    token = request.data.get('resume_token') or request.query_params.get('resume_token')
+    if token:
+        try:
+            job = resume_job(token)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(ImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
     if 'file' not in request.FILES:
         return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
         
     file = request.FILES['file']
     
-    # Print debug info
-    print(f"Processing file: {file.name}")
-    print(f"File size: {file.size} bytes")
+    logger.info('Processing file: %s (%s bytes)', file.name, file.size)
     
-    if not file.name.endswith('.xlsx'):
-        return Response({'error': 'File format not supported. Please upload an Excel (.xlsx) file.'},
+    detected = file_format(file.name)
+    if detected is None:
+        return Response({'error': 'File format not supported. Please upload an Excel (.xlsx) file, '
+                                  'a CSV, TSV or NDJSON file per entity (optionally .gz), or a .zip of them.'},
                         status=status.HTTP_400_BAD_REQUEST)
     
-    results = {
-        'schools_created': 0,
-        'classes_created': 0,
-        'students_created': 0,
-        'errors': []
-    }
+    # A CSV, TSV or NDJSON file holds one entity: ?entity=, or the one it is named after
+    entity = ''
+    if detected[0] in TEXT_FORMATS:
+        entity = request.data.get('entity') or request.query_params.get('entity') or ''
+        if entity and entity not in ENTITIES:
+            return Response({'error': f"Unknown entity '{entity}'. Choose from: {', '.join(ENTITIES)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not entity and entity_sheet(file.name) is None:
+            return Response({'error': f"Name the file after the entity it holds ({', '.join(ENTITIES)}), "
+                                      f"e.g. students.csv, or pass entity."},
+                            status=status.HTTP_400_BAD_REQUEST)
     
-    try:
-        # Read Excel file
-        excel_data = pd.ExcelFile(file)
-        
-        # Debug info
-        print(f"Sheets in file: {excel_data.sheet_names}")
-        
-        # Process Schools sheet if it exists
-        if 'Schools' in excel_data.sheet_names:
-            schools_df = pd.read_excel(excel_data, 'Schools')
-            print(f"Schools sheet columns: {schools_df.columns.tolist()}")
-            for _, row in schools_df.iterrows():
-                if pd.notna(row.get('name')) and row.get('name') != '':
-                    try:
-                        school, created = School.objects.get_or_create(
-                            name=row.get('name'),
-                            defaults={
-                                'address': row.get('address', ''),
-                                'phone': row.get('phone', ''),
-                                'email': row.get('email', '')
-                            }
-                        )
-                        if created:
-                            results['schools_created'] += 1
-                    except Exception as e:
-                        results['errors'].append(f"Error creating school {row.get('name', '')}: {str(e)}")
-        
-        # Process Classes sheet if it exists
-        if 'Classes' in excel_data.sheet_names:
-            classes_df = pd.read_excel(excel_data, 'Classes')
-            for _, row in classes_df.iterrows():
-                if pd.notna(row.get('name')) and row.get('name') != '' and pd.notna(row.get('school_name')) and row.get('school_name') != '':
-                    try:
-                        # Get or create the associated school
-                        school_name = row.get('school_name', '')
-                        try:
-                            school = School.objects.get(name=school_name)
-                        except School.DoesNotExist:
-                            results['errors'].append(f"School '{school_name}' does not exist for class '{row.get('name', '')}'")
-                            continue
-                        
-                        class_name = row.get('name', '')
-                        school_class, created = SchoolClass.objects.get_or_create(
-                            name=class_name,
-                            school=school,
-                            defaults={
-                                'grade_level': row.get('grade_level', ''),
-                                'academic_year': row.get('academic_year', '')
-                            }
-                        )
-                        if created:
-                            results['classes_created'] += 1
-                    except Exception as e:
-                        results['errors'].append(f"Error creating class {row.get('name', '')}: {str(e)}")
-        
-        # Process Students sheet if it exists
-        if 'Students' in excel_data.sheet_names:
-            students_df = pd.read_excel(excel_data, 'Students')
-            for _, row in students_df.iterrows():
-                if pd.notna(row.get('first_name')) and row.get('first_name') != '' and pd.notna(row.get('last_name')) and row.get('last_name') != '':
-                    try:
-                        # Get the associated school and class
-                        school_name = row.get('school_name', '')
-                        class_name = row.get('class_name', '')
-                        
-                        try:
-                            school = School.objects.get(name=school_name)
-                        except School.DoesNotExist:
-                            results['errors'].append(f"School '{school_name}' does not exist for student '{row.get('first_name', '')} {row.get('last_name', '')}'")
-                            continue
-                        
-                        try:
-                            school_class = SchoolClass.objects.get(name=class_name, school=school)
-                        except SchoolClass.DoesNotExist:
-                            results['errors'].append(f"Class '{class_name}' does not exist in school '{school_name}' for student '{row.get('first_name', '')} {row.get('last_name', '')}'")
-                            continue
-                        
-                        # Process date of birth
-                        dob = row.get('date_of_birth', None)
-                        if pd.notna(dob):
-                            dob = pd.to_datetime(dob)
-                        else:
-                            dob = None
-                        
-                        student_id = row.get('student_id', '')
-                        if pd.isna(student_id):
-                            student_id = ''
-                            
-                        # Check if student already exists
-                        student, created = Student.objects.get_or_create(
-                            first_name=row.get('first_name', ''),
-                            last_name=row.get('last_name', ''),
-                            student_id=student_id,
-                            school=school,
-                            school_class=school_class,
-                            defaults={
-                                'date_of_birth': dob,
-                                'email': row.get('email', ''),
-                                'address': row.get('address', ''),
-                                'parent_name': row.get('parent_name', ''),
-                                'parent_contact': row.get('parent_contact', '')
-                            }
-                        )
-                        if created:
-                            results['students_created'] += 1
-                    except Exception as e:
-                        results['errors'].append(f"Error creating student {row.get('first_name', '')} {row.get('last_name', '')}: {str(e)}")
+    # mode=upsert also updates existing rows whose content changed
+    mode = request.data.get('mode') or request.query_params.get('mode') or MODE_CREATE
+    if mode not in MODES:
+        return Response({'error': f"Unknown import mode '{mode}'. Choose from: {', '.join(MODES)}"},
+                        status=status.HTTP_400_BAD_REQUEST)
     
-    except Exception as e:
-        results['errors'].append(f"Error processing Excel file: {str(e)}")
+    # dry_run=1 validates the whole workbook and reports every problem without importing
+    dry_run = request.data.get('dry_run') or request.query_params.get('dry_run') or ''
+    if dry_run.lower() in ('1', 'true', 'yes'):
+        # Validation runs in the request and holds the file's rows in memory
+        if file.size > DRY_RUN_MAX_BYTES:
+            return Response({'error': f"Files over {DRY_RUN_MAX_BYTES // (1024 * 1024)} MB are too large "
+                                      f"for a dry run; import them instead."},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        try:
+            report = validate_workbook(file, file.name, entity or None)
+        except Exception as e:
+            return Response({'error': f"Error processing file: {str(e)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(report)
     
-    return Response(results)
+    # Re-submitting a file already imported (or queued) in the same mode
+    # returns that job instead of importing it again, unless force=1
+    digest = content_hash(file)
+    force = request.data.get('force') or request.query_params.get('force') or ''
+    previous = ImportJob.objects.filter(content_hash=digest, entity=entity, mode=mode).exclude(
+        status=ImportJob.STATUS_FAILED
+    ).first()
+    if previous and force.lower() not in ('1', 'true', 'yes'):
+        completed = previous.status == ImportJob.STATUS_COMPLETED
+        return Response(ImportJobSerializer(previous).data,
+                        status=status.HTTP_200_OK if completed else status.HTTP_202_ACCEPTED)
+
+    # Store each distinct file once; a new job for the same content reuses it
+    stored = ImportJob.objects.filter(content_hash=digest).values_list('file', flat=True).first()
+    if stored and default_storage.exists(stored):
+        file = stored
+
+    # The import itself runs in the run_import_worker process
+    job = ImportJob.objects.create(
+        file=file,
+        original_name=request.FILES['file'].name,
+        content_hash=digest,
+        entity=entity,
+        mode=mode,
+        created_by=request.user if request.user.is_authenticated else None
+    )
+    serializer = ImportJobSerializer(job)
+    return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+@api_view(['GET'])
+def export_data(request):
+    """
+    Stream every school, class or student. ``?type=`` is csv or ndjson
+    with ``?entity=`` schools, classes or students (default students), or
+    xlsx for a workbook in the import template layout.
+    """
+    export_type = request.query_params.get('type', 'csv')
+
+    if export_type == 'xlsx':
+        return stream(request, FileResponse(
+            build_xlsx(), as_attachment=True, filename='school_data_export.xlsx',
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        ))
+
+    entity = request.query_params.get('entity', 'students')
+    if entity not in ENTITIES:
+        return Response({'error': f"Unknown entity '{entity}'. Choose from: {', '.join(ENTITIES)}"},
+                        status=status.HTTP_400_BAD_REQUEST)
+    sheet = ENTITIES[entity]
+
+    if export_type == 'csv':
+        response = StreamingHttpResponse(stream_csv(sheet), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="{entity}.csv"'
+    elif export_type == 'ndjson':
+        response = StreamingHttpResponse(stream_ndjson(sheet), content_type='application/x-ndjson')
+    else:
+        return Response({'error': 'Unknown export type. Choose from: csv, ndjson, xlsx'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    return stream(request, response)
+
+@api_view(['GET'])
+def changes(request):
+    """
+    Stream the inserts, updates and deletes after ``?since=<cursor>`` as
+    NDJSON, oldest first, optionally of one ``?entity=``
+    """
+    try:
+        since = int(request.query_params.get('since', 0))
+    except ValueError:
+        return Response({'error': 'since must be a cursor from an earlier change'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    entity = request.query_params.get('entity')
+    if entity and entity not in ENTITIES:
+        return Response({'error': f"Unknown entity '{entity}'. Choose from: {', '.join(ENTITIES)}"},
+                        status=status.HTTP_400_BAD_REQUEST)
+    # One chunk of the change log per hop to the sync thread under ASGI
+    response = StreamingHttpResponse(stream_changes(since, entity), content_type='application/x-ndjson')
+    return stream(request, response, size=CHANGES_CHUNK_SIZE)
+
+@api_view(['GET'])
+def metrics(request):
+    """Request latency, query and response size metrics in Prometheus text format"""
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 def import_page(request):
     """Render the import page"""
     return render(request, 'core/import.html')
 
-@api_view(['POST'])
-def add_school(request):
-    """Add a single school"""
-    serializer = SchoolSerializer(data=request.data)
-    if serializer.is_valid():
-        serializer.save()
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+def _batch_response(create, items):
+    """Run one of the batch creators in core.batch and wrap its result"""
+    error = check_batch(items)
+    if error:
+        return Response(*error)
+    body, code = create(items)
+    return Response(body, status=code)
 
-@api_view(['POST'])
-def add_class(request):
-    """Add a single class"""
+@sync_to_async
+def _save_unique(serializer):
+    """
+    Validate and save a serializer. The natural key constraints reject
+    duplicates that slip past validation when requests race.
+    Runs in a worker thread: validation queries and transactions are sync only.
+    """
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        with transaction.atomic():
+            serializer.save()
+    except IntegrityError:
+        return Response({'error': 'A record with the same name or id already exists'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+async def _get_school_class(school, class_name, academic_year=None):
+    """
+    Find a class by name, optionally narrowed to an academic year.
+    Without a year the newest class with that name is returned.
+    """
+    classes = SchoolClass.objects.filter(school=school, name=class_name)
+    if academic_year:
+        classes = classes.filter(academic_year=academic_year)
+    school_class = await classes.order_by('-academic_year', '-id').afirst()
+    if school_class is None:
+        raise SchoolClass.DoesNotExist
+    return school_class
+
+# The add-* endpoints are async so that, served over ASGI, many concurrent
+# calls wait on the database without holding a thread each.
+
+@async_api_view(['POST'])
+async def add_school(request):
+    """Add a single school, or a JSON array of them in one transaction"""
+    if isinstance(request.data, list):
+        return await sync_to_async(_batch_response)(create_schools, request.data)
+    
+    return await _save_unique(SchoolSerializer(data=request.data))
+
+@async_api_view(['POST'])
+async def add_class(request):
+    """Add a single class, or a JSON array of them in one transaction"""
+    if isinstance(request.data, list):
+        return await sync_to_async(_batch_response)(create_classes, request.data)
+    
     # Extract school from data
     school_name = request.data.get('school_name')
     if not school_name:
@@ -177,7 +447,7 @@ def add_class(request):
     
     try:
         # Find the school
-        school = School.objects.get(name=school_name)
+        school = await School.objects.aget(name=school_name)
         
         # Prepare the data for the serializer
         class_data = {
@@ -187,18 +457,17 @@ def add_class(request):
             'academic_year': request.data.get('academic_year')
         }
         
-        serializer = SchoolClassSerializer(data=class_data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return await _save_unique(SchoolClassSerializer(data=class_data))
     
     except School.DoesNotExist:
         return Response({'error': f"School '{school_name}' not found"}, status=status.HTTP_404_NOT_FOUND)
 
-@api_view(['POST'])
-def add_student(request):
-    """Add a single student"""
+@async_api_view(['POST'])
+async def add_student(request):
+    """Add a single student, or a JSON array of them in one transaction"""
+    if isinstance(request.data, list):
+        return await sync_to_async(_batch_response)(create_students, request.data)
+    
     # Extract school and class from data
     school_name = request.data.get('school_name')
     class_name = request.data.get('class_name')
@@ -210,11 +479,11 @@ def add_student(request):
     
     try:
         # Find the school
-        school = School.objects.get(name=school_name)
+        school = await School.objects.aget(name=school_name)
         
         # Find the class
         try:
-            school_class = SchoolClass.objects.get(name=class_name, school=school)
+            school_class = await _get_school_class(school, class_name, request.data.get('academic_year'))
             
             # Prepare the data for the serializer
             student_data = {
@@ -240,11 +509,7 @@ def add_student(request):
                 except Exception as e:
                     return Response({'error': f"Invalid date format: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
             
-            serializer = StudentSerializer(data=student_data)
-            if serializer.is_valid():
-                serializer.save()
-                return Response(serializer.data, status=status.HTTP_201_CREATED)
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            return await _save_unique(StudentSerializer(data=student_data))
             
         except SchoolClass.DoesNotExist:
             return Response({'error': f"Class '{class_name}' not found in school '{school_name}'"}, status=status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,186 @@
+import hashlib
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from django.conf import settings
+from .readers import SHEETS, open_source
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = getattr(settings, 'IMPORT_CACHE_DIR', os.path.join(settings.BASE_DIR, '.cache', 'workbooks'))
+CACHE_MAX_BYTES = getattr(settings, 'IMPORT_CACHE_MAX_MB', 256) * 1024 * 1024
+
+# Rows pickled together; reading back never holds more than one chunk
+CHUNK_ROWS = 1000
+
+# Unfinished entries left behind by a crashed worker are removed after this many seconds
+STALE_SECONDS = 24 * 60 * 60
+
+
+def content_hash(file):
+    """SHA-256 hex digest of an uploaded or stored file, read in chunks"""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def _entry(key):
+    return os.path.join(CACHE_DIR, key)
+
+
+class CachedWorkbook:
+    """
+    Sheets of a workbook read back from the cache. Each sheet file holds
+    its column names followed by pickled chunks of row values, which load
+    far faster than openpyxl parses the XML they came from.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'sheets.pickle'), 'rb') as f:
+            self.sheetnames = pickle.load(f)
+
+    def rows(self, sheet):
+        with open(os.path.join(self.path, f'{sheet}.pickle'), 'rb') as f:
+            columns = pickle.load(f)
+            while True:
+                try:
+                    chunk = pickle.load(f)
+                except EOFError:
+                    return
+                for values in chunk:
+                    yield dict(zip(columns, values))
+
+    def close(self):
+        pass
+
+
+class ParsedWorkbook:
+    """
+    Sheets parsed from the uploaded file itself (see core.readers).
+
+    With a cache key, every row parsed is also written to a new cache
+    entry. close() parses whatever the import did not read (sheets skipped
+    when resuming, rows after a failed batch) so the entry is complete and
+    the next run of the same file never parses it.
+    """
+
+    def __init__(self, source, key=None):
+        self.source = source
+        self.sheetnames = source.sheetnames
+        self.key = key
+        self.tmp = None
+        self.complete = set()
+        self.readers = {}
+        if key:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            self.tmp = tempfile.mkdtemp(prefix=f'{key}.', suffix='.tmp', dir=CACHE_DIR)
+
+    def rows(self, sheet):
+        rows = self.source.rows(sheet)
+        if self.tmp and sheet in SHEETS:
+            rows = self._write(sheet, rows)
+            self.readers[sheet] = rows
+        return rows
+
+    def _write(self, sheet, rows):
+        with open(os.path.join(self.tmp, f'{sheet}.pickle'), 'wb') as f:
+            columns = None
+            chunk = []
+            for row in rows:
+                if columns is None:
+                    columns = list(row)
+                    pickle.dump(columns, f, pickle.HIGHEST_PROTOCOL)
+                chunk.append(tuple(row.values()))
+                if len(chunk) >= CHUNK_ROWS:
+                    pickle.dump(chunk, f, pickle.HIGHEST_PROTOCOL)
+                    chunk = []
+                yield row
+            if columns is None:
+                pickle.dump([], f, pickle.HIGHEST_PROTOCOL)
+            if chunk:
+                pickle.dump(chunk, f, pickle.HIGHEST_PROTOCOL)
+        # Only reached once the sheet was read to the end without errors
+        self.complete.add(sheet)
+
+    def close(self):
+        try:
+            if self.tmp:
+                self._save()
+        finally:
+            self.source.close()
+
+    def _save(self):
+        sheets = [sheet for sheet in SHEETS if sheet in self.sheetnames]
+        try:
+            for sheet in sheets:
+                for _ in self.readers.get(sheet) or self.rows(sheet):
+                    pass
+            if self.complete != set(sheets):
+                # A sheet could not be parsed; never cache part of a workbook
+                shutil.rmtree(self.tmp, ignore_errors=True)
+                return
+            with open(os.path.join(self.tmp, 'sheets.pickle'), 'wb') as f:
+                pickle.dump(self.sheetnames, f, pickle.HIGHEST_PROTOCOL)
+            os.rename(self.tmp, _entry(self.key))
+        except Exception as e:
+            # Another worker cached the same file first, or the rest of the file is unreadable
+            logger.info('Not caching workbook %s: %s', self.key, e)
+            shutil.rmtree(self.tmp, ignore_errors=True)
+            return
+        evict()
+
+
+def open_cached(key):
+    """The cached sheets of the file with this content hash, or None"""
+    path = _entry(key)
+    try:
+        # The entry's mtime records its last use for LRU eviction
+        os.utime(path)
+        return CachedWorkbook(path)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+
+
+def open_sheets(file, name, key=None, entity=None):
+    """
+    Sheets of an uploaded file: from the cache when the file with content
+    hash ``key`` was parsed before, otherwise from the file (see
+    core.readers.open_source for ``name`` and ``entity``).
+    """
+    if key:
+        cached = open_cached(key)
+        if cached is not None:
+            return cached
+    return ParsedWorkbook(open_source(file, name, entity), key)
+
+
+def evict(max_bytes=CACHE_MAX_BYTES):
+    """Delete least recently used entries until the cache fits in ``max_bytes``"""
+    entries = []
+    now = time.time()
+    for name in os.listdir(CACHE_DIR):
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            used = os.path.getmtime(path)
+            if name.endswith('.tmp'):
+                if now - used > STALE_SECONDS:
+                    shutil.rmtree(path, ignore_errors=True)
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(path))
+        except OSError:
+            # Removed by another worker meanwhile
+            continue
+        entries.append((used, size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
@@ -1,3 +1,5 @@
+import argparse
+import random
 import pandas as pd
 import openpyxl
 from openpyxl.styles import Font, PatternFill, Border, Side, Alignment
@@ -138,5 +140,68 @@ def create_sample_excel_template(filename="school_data_template.xlsx"):
     print(f"Template created successfully: {filename}")
     return filename
 
+def create_synthetic_workbook(filename="synthetic_school_data.xlsx", schools=10, classes_per_school=10,
+                              students_per_class=25, seed=0):
+    """
+    Create a workbook of N schools x M classes x K students for load testing.
+    Uses the same sheets and columns as the import template. Rows are written
+    with openpyxl's write-only mode, so large files do not need much memory.
+    """
+    rng = random.Random(seed)
+    first_names = ['Alex', 'Sam', 'Jordan', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Jamie', 'Avery', 'Quinn']
+    last_names = ['Smith', 'Nguyen', 'Brown', 'Wilson', 'Taylor', 'Lee', 'Martin', 'Walker', 'Hall', 'Young']
+
+    workbook = openpyxl.Workbook(write_only=True)
+    schools_sheet = workbook.create_sheet('Schools')
+    classes_sheet = workbook.create_sheet('Classes')
+    students_sheet = workbook.create_sheet('Students')
+
+    schools_sheet.append(['name', 'address', 'phone', 'email'])
+    classes_sheet.append(['school_name', 'name', 'grade_level', 'academic_year'])
+    students_sheet.append(['first_name', 'last_name', 'student_id', 'date_of_birth', 'school_name',
+                           'class_name', 'email', 'address', 'parent_name', 'parent_contact'])
+
+    student_number = 0
+    for s in range(1, schools + 1):
+        school_name = f"Synthetic School {s:04d}"
+        schools_sheet.append([school_name, f"{s} School Rd, Cityville", f"555-{s:04d}", f"office{s}@school.example"])
+
+        for c in range(1, classes_per_school + 1):
+            grade = 1 + (c - 1) % 12
+            class_name = f"Class {grade}-{c:03d}"
+            classes_sheet.append([school_name, class_name, str(grade), '2024-2025'])
+
+            for _ in range(students_per_class):
+                student_number += 1
+                first_name = rng.choice(first_names)
+                last_name = rng.choice(last_names)
+                birth_year = 2018 - grade
+                students_sheet.append([
+                    first_name, last_name, f"S{student_number:07d}",
+                    f"{birth_year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                    school_name, class_name,
+                    f"{first_name.lower()}.{last_name.lower()}{student_number}@student.example",
+                    f"{rng.randint(1, 999)} Oak Rd, Townsville",
+                    f"Parent of {first_name} {last_name}", f"555-{rng.randint(0, 9999):04d}"
+                ])
+
+    workbook.save(filename)
+    print(f"Synthetic workbook created: {filename} "
+          f"({schools} schools, {schools * classes_per_school} classes, {student_number} students)")
+    return filename
+
 if __name__ == "__main__":
-    create_sample_excel_template()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Create the import template or a synthetic workbook")
+    parser.add_argument('--synthetic', action='store_true', help="Generate synthetic data instead of the template")
+    parser.add_argument('--schools', type=int, default=10)
+    parser.add_argument('--classes', type=int, default=10, help="Classes per school")
+    parser.add_argument('--students', type=int, default=25, help="Students per class")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help="Output filename")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        create_synthetic_workbook(args.output or "synthetic_school_data.xlsx", args.schools,
+                                  args.classes, args.students, args.seed)
+    else:
+        create_sample_excel_template(args.output or "school_data_template.xlsx")
\ No newline at end of file
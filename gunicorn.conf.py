@@ -0,0 +1,32 @@
+# Gunicorn settings, read from the environment so they can be tuned per
+# instance without changing the start command. Gunicorn loads this file
+# from the working directory automatically.
+import os
+
+# Worker processes. Each one loads the whole app, so size this to the
+# instance's memory; Render and Heroku set WEB_CONCURRENCY.
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+
+# Threads per worker. With more than one, gunicorn uses the gthread worker
+# so requests waiting on the database don't block the whole process.
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# To serve school_api.asgi, set GUNICORN_WORKER_CLASS to
+# uvicorn_worker.UvicornWorker; threads then no longer apply
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS') or ('gthread' if threads > 1 else 'sync')
+
+# Large uploads are queued rather than imported in the request, so the
+# default timeout is plenty
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers now and then so slow leaks can't build up; the jitter
+# stops them all restarting at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+# Gunicorn binds to 0.0.0.0:$PORT when PORT is set, as on Render
+if 'GUNICORN_BIND' in os.environ:
+    bind = os.environ['GUNICORN_BIND']
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
@@ -2,6 +2,9 @@
 ASGI config for school_api project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Run it with uvicorn (``uvicorn school_api.asgi:application``) or, as in
+render.yaml, gunicorn with uvicorn_worker.UvicornWorker workers. The add-*
+endpoints are async views, so one worker handles many concurrent calls.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
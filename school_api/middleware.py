@@ -0,0 +1,33 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from inspect import isawaitable
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that can also run in an async middleware chain.
+
+    WhiteNoise itself is sync only, and one sync middleware makes Django
+    hold a thread for every request under ASGI. Looking up a static file is
+    an in-memory dict lookup, so the async path runs the same check and
+    awaits the rest of the chain when the path is not a static file.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        # Returns a file response, or the coroutine of the next handler
+        response = super().__call__(request)
+        if isawaitable(response):
+            response = await response
+        return response
@@ -49,12 +49,13 @@ INSTALLED_APPS = [
     # Third-party apps
     'rest_framework',
     'rest_framework.authtoken',
+    'django_filters',
 ]
 
 # Add REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api_auth.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',  # Keep this for browsable API
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -64,9 +65,16 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10
 }
 
+# Resolved API tokens cached per process by CachedTokenAuthentication
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 1024))
+TOKEN_CACHE_TTL = int(os.environ.get('TOKEN_CACHE_TTL', 60))
+# Seconds between batched writes of token last-used times
+TOKEN_USAGE_FLUSH_INTERVAL = int(os.environ.get('TOKEN_USAGE_FLUSH_INTERVAL', 60))
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Add whitenoise for static files
+    'core.metrics.MetricsMiddleware',  # Per-view latency, query count and response size
+    'school_api.middleware.AsyncWhiteNoiseMiddleware',  # Whitenoise for static files, async capable for ASGI
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -114,6 +122,28 @@ if 'DATABASE_URL' in os.environ:
         'default': dj_database_url.config(default=os.environ.get('DATABASE_URL'))
     }
 
+# Keep connections open between requests instead of paying the connect, TLS
+# and auth cost on every call. Health checks replace a connection that went
+# away while idle before it is reused. Each gunicorn thread holds its own
+# connection, so the database sees up to workers x threads of them.
+# Under ASGI set DB_CONN_MAX_AGE=0 and use the pool below instead: async
+# requests run their queries on short-lived threads that never reuse them.
+DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 600))
+DATABASES['default']['CONN_HEALTH_CHECKS'] = os.environ.get('DB_CONN_HEALTH_CHECKS', 'true').lower() != 'false'
+
+# Optional in-process pool for PostgreSQL (psycopg 3 with the pool extra).
+# The pool replaces persistent connections, so CONN_MAX_AGE must be 0 with it.
+# Older URL parsers name the backend postgresql_psycopg2, an alias of the
+# same psycopg backend that Django 5 no longer has.
+if os.environ.get('DB_POOL_MAX_SIZE') and DATABASES['default']['ENGINE'].startswith('django.db.backends.postgresql'):
+    DATABASES['default']['ENGINE'] = 'django.db.backends.postgresql'
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+        'max_size': int(os.environ['DB_POOL_MAX_SIZE']),
+        'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -152,8 +182,98 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
-# Enable WhiteNoise compression and caching
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Enable WhiteNoise compression and caching. Django 5.1 removed
+# STATICFILES_STORAGE; storages are configured here instead.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Uploaded files (queued Excel imports)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', os.path.join(BASE_DIR, 'media'))
+
+# Caches. The 'api' cache holds list/detail responses and the model
+# version counters that invalidate them; it is file based so every
+# gunicorn worker and the import worker on an instance share it.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'api': {
+        'BACKEND': os.environ.get('API_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get('API_CACHE_LOCATION', os.path.join(BASE_DIR, '.cache', 'api')),
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+}
+
+# Seconds a cached API response is kept (writes invalidate it sooner)
+API_CACHE_TIMEOUT = int(os.environ.get('API_CACHE_TIMEOUT', 300))
+
+# Rows committed per import transaction; each commit saves a resume checkpoint
+IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 1000))
+
+# Writer threads used by the import pipeline (ignored on SQLite)
+IMPORT_WRITER_THREADS = int(os.environ.get('IMPORT_WRITER_THREADS', 2))
+
+# A running import whose worker sent no heartbeat (one per committed batch)
+# for this long is taken to be orphaned by a killed worker and requeued to
+# resume from its checkpoint, or failed once it was tried IMPORT_MAX_ATTEMPTS times
+IMPORT_STALE_SECONDS = int(os.environ.get('IMPORT_STALE_SECONDS', 15 * 60))
+IMPORT_MAX_ATTEMPTS = int(os.environ.get('IMPORT_MAX_ATTEMPTS', 3))
+
+# Parsed workbook sheets, keyed by the upload's SHA-256, so re-running an
+# import of the same file skips Excel parsing. Least recently used entries
+# are evicted once the directory grows past IMPORT_CACHE_MAX_MB.
+IMPORT_CACHE_DIR = os.environ.get('IMPORT_CACHE_DIR', os.path.join(BASE_DIR, '.cache', 'workbooks'))
+IMPORT_CACHE_MAX_MB = int(os.environ.get('IMPORT_CACHE_MAX_MB', 256))
+
+# Largest upload validated with ?dry_run=1. The dry run runs inside the
+# request and holds the checked columns of every row in memory, so bigger
+# files should be imported through the worker instead.
+IMPORT_DRY_RUN_MAX_MB = int(os.environ.get('IMPORT_DRY_RUN_MAX_MB', 20))
+
+# Changes younger than this are held back from /api/changes/ so that
+# transactions still open when a client reads cannot commit behind its cursor
+CHANGE_FEED_DELAY_SECONDS = int(os.environ.get('CHANGE_FEED_DELAY_SECONDS', 30))
+
+# Requests running more queries than this are logged as a possible N+1
+API_QUERY_BUDGET = int(os.environ.get('API_QUERY_BUDGET', 30))
+
+# The app loggers (import progress, N+1 warnings, cache notes) write to
+# stderr, which the web and worker processes both send to the platform log
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {
+            'format': '{asctime} {levelname} {process} {name}: {message}',
+            'style': '{',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'simple',
+        },
+    },
+    'loggers': {
+        'core': {
+            'handlers': ['console'],
+            'level': os.environ.get('LOG_LEVEL', 'INFO'),
+        },
+        'api_auth': {
+            'handlers': ['console'],
+            'level': os.environ.get('LOG_LEVEL', 'INFO'),
+        },
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
@@ -0,0 +1,21 @@
+#!/usr/bin/env bash
+# Start command: the import worker and gunicorn run side by side so both
+# see the uploaded files.
+#
+# The worker is the only consumer of the import queue. If it exits,
+# uploads queue forever while the web process stays healthy, so it runs
+# under a restart loop. A job it was running when it died is requeued
+# from its checkpoint once its heartbeat is older than
+# IMPORT_STALE_SECONDS (see core.importer.recover_stale_jobs).
+set -o errexit
+
+(
+    while true; do
+        python manage.py run_import_worker || echo "Import worker exited with status $?" >&2
+        echo "Restarting the import worker in 5 seconds" >&2
+        sleep 5
+    done
+) &
+
+# Gunicorn runs the ASGI app with uvicorn workers (see gunicorn.conf.py)
+exec gunicorn school_api.asgi:application -c gunicorn.conf.py